@@ -0,0 +1,196 @@
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+
+# Parts alert when their stock drops below this, unless their 'Minimum stock' column says otherwise
+DEFAULT_PART_MINIMUM = 0
+# Models alert when fewer than this many vehicles are buildable, e.g. {"Loader": 10}; others use the engine default
+MODEL_MINIMUMS = {}
+
+
+# Function to get the minimum stock of the given rows: the 'Minimum stock' column where set, else the default
+def part_minimums(table, positions):
+    if 'Minimum stock' not in table.arrays:
+        return np.full(len(positions), DEFAULT_PART_MINIMUM)
+    minimum = np.asarray(table.arrays['Minimum stock'])[positions]
+    if minimum.dtype.kind == 'f':
+        minimum = np.where(np.isnan(minimum), DEFAULT_PART_MINIMUM, minimum)
+    return minimum
+
+
+# Function to word an alert for people reading the notifications
+def alert_message(kind, subject, event, value, threshold):
+    if kind == 'part':
+        if event == 'raised':
+            return f"{subject}: stock {value} is below the minimum of {threshold}"
+        return f"{subject}: stock back to {value} (minimum {threshold})"
+    if event == 'raised':
+        return f"{subject}: only {value} buildable, below the minimum of {threshold}"
+    return f"{subject}: {value} buildable again (minimum {threshold})"
+
+
+# Alerts waiting for a notifier, plus the raised/cleared state of every part and model, in one SQLite file.
+# Processes sharing the file share the de-duplication: a transition is decided inside a write transaction.
+class AlertOutbox:
+    def __init__(self, path):
+        self.path = path
+        self._created = False
+
+    # The file and its tables are created on first use, so merely importing the app creates nothing
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if not self._created:
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                             'created REAL, kind TEXT, subject TEXT, event TEXT, value INTEGER, '
+                             'threshold INTEGER, message TEXT, delivered REAL)')
+                conn.execute('CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (delivered, id)')
+                conn.execute('CREATE TABLE IF NOT EXISTS alert_state (kind TEXT, subject TEXT, active INTEGER, '
+                             'notified INTEGER, last_raised REAL, PRIMARY KEY (kind, subject))')
+            self._created = True
+        return conn
+
+    # Function to list the (kind, subject) pairs currently in breach
+    def active(self):
+        with closing(self._connect()) as conn:
+            return set(conn.execute('SELECT kind, subject FROM alert_state WHERE active = 1').fetchall())
+
+    # Function to apply breach changes [(kind, subject, breached, value, threshold)] in one transaction;
+    # writes an alert per real transition unless the subject was raised less than min_interval seconds ago;
+    # returns the alerts written
+    def record(self, changes, now, min_interval):
+        written = []
+        with closing(self._connect()) as conn:
+            with conn:
+                for kind, subject, breached, value, threshold in changes:
+                    row = conn.execute('SELECT active, notified, last_raised FROM alert_state '
+                                       'WHERE kind = ? AND subject = ?', (kind, subject)).fetchone()
+                    active, notified, last_raised = row if row is not None else (0, 0, None)
+                    if bool(active) == breached:
+                        # Another process already recorded this transition
+                        continue
+                    event = None
+                    if breached:
+                        notified = last_raised is None or now - last_raised >= min_interval
+                        if notified:
+                            event, last_raised = 'raised', now
+                    elif notified:
+                        # A raise that was rate-limited away is not followed by a lone clear
+                        event = 'cleared'
+                    conn.execute('INSERT OR REPLACE INTO alert_state VALUES (?, ?, ?, ?, ?)',
+                                 (kind, subject, int(breached), int(notified), last_raised))
+                    if event is not None:
+                        alert = {'created': now, 'kind': kind, 'subject': subject, 'event': event, 'value': value,
+                                 'threshold': threshold,
+                                 'message': alert_message(kind, subject, event, value, threshold)}
+                        conn.execute('INSERT INTO outbox (created, kind, subject, event, value, threshold, message) '
+                                     'VALUES (:created, :kind, :subject, :event, :value, :threshold, :message)',
+                                     alert)
+                        written.append(alert)
+        return written
+
+    # Function to list undelivered alerts, oldest first
+    def pending(self, limit=100):
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute('SELECT * FROM outbox WHERE delivered IS NULL ORDER BY id LIMIT ?', (limit,))
+            return [dict(row) for row in rows]
+
+    # Function to mark alerts delivered so no notifier sends them again
+    def mark_delivered(self, ids, when=None):
+        when = time.time() if when is None else when
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.executemany('UPDATE outbox SET delivered = ? WHERE id = ?', [(when, i) for i in ids])
+
+    # Function to hand pending alerts to send(alert) in order, marking each delivered once sent; stops at the
+    # first failure so it is retried on the next drain. Returns the number delivered
+    def drain(self, send, limit=100):
+        delivered = []
+        try:
+            for alert in self.pending(limit):
+                send(alert)
+                delivered.append(alert['id'])
+        finally:
+            if delivered:
+                self.mark_delivered(delivered)
+        return len(delivered)
+
+
+# Checks part and model thresholds against a StockState as deltas are applied, looking only at the touched rows
+# and the models that need them; the outbox is written only when something crosses a threshold
+class AlertEngine:
+    def __init__(self, outbox, default_model_minimum=1, min_interval=3600):
+        self.outbox = outbox
+        self.default_model_minimum = default_model_minimum
+        # Seconds before a part or model that recovered may alert again, so a flapping stock level can't flood
+        self.min_interval = min_interval
+        self.written = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._names = None
+        self._part_active = None
+        self._model_active = None
+
+    # Function to sync the in-memory breach flags with the outbox for a state's part name table
+    def _flags(self, table):
+        if self._names is not table.names:
+            active = self.outbox.active()
+            self._names = table.names
+            self._part_active = table.names.isin([subject for kind, subject in active if kind == 'part'])
+            self._model_active = {subject for kind, subject in active if kind == 'model'}
+        return self._part_active, self._model_active
+
+    def model_minimum(self, model):
+        return MODEL_MINIMUMS.get(model, self.default_model_minimum)
+
+    # Function to check the given row positions of a state, or every row when positions is None; returns the
+    # alerts written. Outbox errors are kept in last_error rather than failing the stock change, until the outbox
+    # works again
+    def evaluate(self, state, positions=None):
+        table = state.table
+        with self._lock:
+            try:
+                part_active, model_active = self._flags(table)
+            except sqlite3.Error as error:
+                self.last_error = error
+                return []
+            if positions is None:
+                positions = np.arange(len(table))
+            positions = np.asarray(positions, dtype=np.int64)
+            stock = table.stock[positions]
+            minimum = part_minimums(table, positions)
+            codes = table.codes[positions]
+            breached = stock < minimum
+            changed = np.flatnonzero(breached != part_active[codes])
+            changes = [('part', table.names[codes[i]], bool(breached[i]), int(stock[i]), int(minimum[i]))
+                       for i in changed.tolist()]
+            # Only models with a touched required part can have changed their buildable count
+            touched = state.producibility.required[positions].any(axis=0)
+            buildable = state.buildable()
+            for model, affected in zip(state.producibility.models, touched.tolist()):
+                model_breached = buildable[model] < self.model_minimum(model)
+                if affected and model_breached != (model in model_active):
+                    changes.append(('model', model, model_breached, buildable[model], self.model_minimum(model)))
+            if not changes:
+                return []
+            try:
+                written = self.outbox.record(changes, time.time(), self.min_interval)
+            except sqlite3.Error as error:
+                # The flags stay as they were, so the next change to these rows tries again
+                self.last_error = error
+                return []
+            self.last_error = None
+            part_active[codes[changed]] = breached[changed]
+            for kind, subject, is_breached, _, _ in changes:
+                if kind == 'model' and is_breached:
+                    model_active.add(subject)
+                elif kind == 'model':
+                    model_active.discard(subject)
+            self.written += len(written)
+            return written
@@ -0,0 +1,66 @@
+"""Cost of checking low-stock alert thresholds on every stock change, at catalogue scale.
+
+Times an in-memory stock change (add_stock + refresh_producible) and the alert check after it, for a small
+receipt, a whole-catalogue production batch, and a change that crosses a threshold and so writes the outbox.
+Also checks the de-duplication: a part that stays below its minimum alerts once, and a recovery clears it once.
+
+Run from the repository root:  python -m benchmarks.bench_alerts
+"""
+import os
+import tempfile
+import time
+
+from alerts import AlertEngine, AlertOutbox
+from benchmarks.synthetic import make_catalogue
+from stock_core import StockState, refresh_producible
+
+
+# Function to apply deltas in memory and check the alerts; returns (seconds changing stock, seconds checking alerts)
+def apply(state, deltas, engine):
+    start = time.perf_counter()
+    positions, _ = state.table.add_stock(deltas)
+    refresh_producible(state, positions)
+    changed = time.perf_counter()
+    engine.evaluate(state, positions)
+    return changed - start, time.perf_counter() - changed
+
+
+# Function to apply deltas and undo them repeat times; returns the mean seconds of both parts per change
+def time_apply(state, deltas, engine, repeat=20):
+    undo = {part: -delta for part, delta in deltas.items()}
+    timings = [apply(state, changes, engine) for _ in range(repeat) for changes in (deltas, undo)]
+    return [sum(column) / len(timings) for column in zip(*timings)]
+
+
+def part_alerts(engine):
+    return [alert for alert in engine.outbox.pending(1000) if alert['kind'] == 'part']
+
+
+if __name__ == '__main__':
+    n_parts = 100_000
+    df, parts_requirements = make_catalogue(n_parts, min_stock=10)
+    parts = df['Parts'].tolist()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlertEngine(AlertOutbox(os.path.join(tmp, 'alerts.db')), default_model_minimum=0)
+        state = StockState(df.copy(), parts_requirements)
+        start = time.perf_counter()
+        engine.evaluate(state)
+        full = time.perf_counter() - start
+
+        receipt = {part: 5 for part in parts[:5]}
+        batch = {part: -1 for part in parts}
+        crossing = {parts[0]: -10_000}
+        print(f"{n_parts} parts; full check of every part {full * 1e3:.1f} ms")
+        print(f"{'stock change':>24} {'change (ms)':>11} {'alerts (ms)':>11} {'overhead':>8}")
+        for name, deltas in (('receipt, 5 parts', receipt), ('production, every part', batch),
+                             ('crosses a threshold', crossing)):
+            change, check = time_apply(state, deltas, engine)
+            print(f"{name:>24} {change * 1e3:>11.3f} {check * 1e3:>11.3f} {check / change:>8.1%}")
+
+        # The part crossed in and out 20 times within the rate-limit interval: one raise, one clear
+        assert [alert['event'] for alert in part_alerts(engine)] == ['raised', 'cleared']
+        # Staying below the minimum after a raise adds nothing
+        apply(state, {parts[1]: -10_000}, engine)
+        apply(state, {parts[1]: -5}, engine)
+        assert [alert['subject'] for alert in part_alerts(engine)] == [parts[0], parts[0], parts[1]]
+        print(f"De-duplication holds: {len(part_alerts(engine))} part alerts for 41 threshold crossings")
@@ -0,0 +1,35 @@
+"""Load time and peak memory: pd.read_excel vs. the streamed, compact-dtype reader.
+
+Run from the repository root:  python -m benchmarks.bench_excel_stream
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import make_catalogue
+from excel_stream import read_table
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    table = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return table, elapsed, peak
+
+
+if __name__ == '__main__':
+    print(f"{'parts':>8} {'reader':>10} {'time (s)':>9} {'peak MB':>8} {'frame MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_parts in (20_000, 100_000):
+            path = os.path.join(tmp, f'{n_parts}.xlsx')
+            make_catalogue(n_parts)[0].to_excel(path, index=False)
+            for name, reader in (('read_excel', pd.read_excel), ('streamed', read_table)):
+                table, elapsed, peak = measure(reader, path)
+                size = table.memory_usage(deep=True).sum()
+                print(f"{n_parts:>8} {name:>10} {elapsed:>9.2f} {peak / 1e6:>8.1f} {size / 1e6:>9.1f}")
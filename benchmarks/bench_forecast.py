@@ -0,0 +1,40 @@
+"""Consumption forecast over a year of synthetic journal history for 50k parts.
+
+Run from the repository root:  python -m benchmarks.bench_forecast
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_catalogue
+from forecast import SECONDS_PER_DAY, consumption_rates, forecast_stock
+
+
+# Function to generate journal movements spread over the past days, mostly consumption, typed like load_movements
+def make_movements(parts, n_movements, days=365, seed=0):
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    return pd.DataFrame({
+        'timestamp': now - rng.random(n_movements) * days * SECONDS_PER_DAY,
+        'part': rng.choice(np.asarray(parts, dtype=object), n_movements),
+        'delta': np.where(rng.random(n_movements) < 0.8, -rng.integers(1, 5, n_movements),
+                          rng.integers(10, 100, n_movements)),
+        'reason': np.where(rng.random(n_movements) < 0.8, 'production', 'received'),
+        'model': None,
+    }).astype({'part': 'category', 'reason': 'category'})
+
+
+if __name__ == '__main__':
+    n_parts = 50_000
+    df, _ = make_catalogue(n_parts, min_stock=0)
+    print(f"{'movements':>10} {'rates (s)':>10} {'projection (s)':>15}")
+    for n_movements in (1_000_000, 5_000_000):
+        movements = make_movements(df['Parts'], n_movements)
+        start = time.perf_counter()
+        mean, std = consumption_rates(movements, df['Parts'])
+        rates_time = time.perf_counter() - start
+        start = time.perf_counter()
+        forecast_stock(df['Parts'], df['Stock'].to_numpy(), mean, std, 14)
+        projection_time = time.perf_counter() - start
+        print(f"{n_movements:>10} {rates_time:>10.2f} {projection_time:>15.3f}")
@@ -0,0 +1,49 @@
+"""Single-part stock updates: incremental producibility index vs. a full recompute.
+
+Also checks that the incremental results match a full recompute after many random updates.
+Run from the repository root:  python -m benchmarks.bench_incremental
+"""
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_catalogue
+from producibility import ProducibilityIndex, calculate_buildable, calculate_producible
+from stock_arrays import StockTable
+
+
+if __name__ == '__main__':
+    n_parts, n_updates = 100_000, 1_000
+    df, parts_requirements = make_catalogue(n_parts)
+    rng = np.random.default_rng(1)
+    positions = rng.integers(0, n_parts, n_updates)
+    deltas = rng.integers(-100, 100, n_updates)
+
+    start = time.perf_counter()
+    producibility = ProducibilityIndex(df['Parts'], df['Stock'].to_numpy(), parts_requirements)
+    build = time.perf_counter() - start
+
+    stock = df['Stock'].to_numpy().copy()
+    start = time.perf_counter()
+    for position, delta in zip(positions, deltas):
+        stock[position] += delta
+        producibility.update([position], stock)
+        producibility.buildable()
+    incremental = (time.perf_counter() - start) / n_updates
+
+    full_df = df.copy()
+    start = time.perf_counter()
+    for position, delta in zip(positions[:20], deltas[:20]):
+        full_df.iloc[position, full_df.columns.get_loc('Stock')] += delta
+        calculate_producible(full_df, parts_requirements)
+        calculate_buildable(full_df, parts_requirements)
+    full = (time.perf_counter() - start) / 20
+
+    df['Stock'] = stock
+    assert producibility.buildable() == calculate_buildable(df, parts_requirements)
+    written = producibility.write_columns(StockTable(df)).frame()
+    expected = calculate_producible(df.copy(), parts_requirements)
+    assert all((written[column] == expected[column]).all() for column in expected.columns[len(df.columns):])
+    print(f"{n_parts} parts: index build {build * 1e3:.1f} ms, "
+          f"single-part update {incremental * 1e6:.0f} us incremental vs {full * 1e3:.1f} ms full "
+          f"({full / incremental:.0f}x); results match a full recompute")
@@ -0,0 +1,38 @@
+"""Per-call overhead of instrumentation spans and the timed decorator, recording on vs. off.
+
+Run from the repository root:  python -m benchmarks.bench_instrumentation
+"""
+import time
+
+import instrumentation
+
+
+def bare():
+    return None
+
+
+@instrumentation.timed('bench.decorated')
+def decorated():
+    return None
+
+
+def with_span():
+    with instrumentation.span('bench.span'):
+        return None
+
+
+def per_call(func, calls=200_000):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+
+if __name__ == '__main__':
+    baseline = per_call(bare)
+    print(f"{'recording':>9} {'wrapper':>10} {'overhead (ns/call)':>19}")
+    for flag in (False, True):
+        instrumentation.set_enabled(flag)
+        for name, func in (('decorator', decorated), ('span', with_span)):
+            print(f"{'on' if flag else 'off':>9} {name:>10} {(per_call(func) - baseline) * 1e9:>19.0f}")
+    instrumentation.reset()
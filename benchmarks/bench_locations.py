@@ -0,0 +1,46 @@
+"""Per-location roll-ups: one location's view and buildable counts for every location, as locations are added.
+
+A location's view is built on the first rerun that shows it and reused until the stock changes.
+
+Run from the repository root:  python -m benchmarks.bench_locations
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_catalogue
+from locations import LocationStock
+from stock_core import StockState, buildable_by_location, location_state
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    n_parts = 100_000
+    df, parts_requirements = make_catalogue(n_parts, min_stock=0)
+    rng = np.random.default_rng(1)
+    print(f"{'locations':>9} {'cells':>8} {'view, first (ms)':>17} {'view, reused (ms)':>18} "
+          f"{'buildable, all (ms)':>20}")
+    for n_locations in (1, 3, 10):
+        locations = [f"Depot {i}" for i in range(n_locations)]
+        # Spread roughly a third of each part's stock over the non-default locations
+        held = rng.random(n_parts) < 0.5
+        table = pd.DataFrame({
+            'Parts': df['Parts'][held],
+            'Location': rng.choice(locations[1:] or locations, held.sum()),
+            'Stock': df['Stock'][held] // 3,
+        })
+        state = StockState(df.copy(), parts_requirements, LocationStock(df['Parts'], locations, table))
+        first_time = timed(location_state, state, locations[-1], repeat=1)
+        reused_time = timed(location_state, state, locations[-1])
+        rollup_time = timed(buildable_by_location, state)
+        print(f"{n_locations:>9} {len(state.locations.cells):>8} {first_time * 1e3:>17.1f} {reused_time * 1e3:>18.3f} "
+              f"{rollup_time * 1e3:>20.1f}")
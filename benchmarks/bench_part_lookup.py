@@ -0,0 +1,39 @@
+"""Per-operation cost of stock updates: boolean masks per part vs. the part index.
+
+Run from the repository root:  python -m benchmarks.bench_part_lookup
+"""
+import time
+
+from benchmarks.synthetic import make_catalogue
+from part_index import build_part_index, add_stock
+
+
+# The per-part boolean-mask update main.py used before the part index
+def add_stock_masks(df, deltas):
+    for part, delta in deltas.items():
+        df.loc[df['Parts'] == part, 'Stock'] += delta
+    return df
+
+
+def time_call(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    touched = 300
+    print(f"Recording one model that uses {touched} parts")
+    print(f"{'parts':>8} {'masks (ms)':>11} {'index build (ms)':>17} {'indexed (ms)':>13}")
+    for n_parts in (1_000, 10_000, 100_000):
+        df, _ = make_catalogue(n_parts)
+        deltas = {f"Part {i}": -1 for i in range(0, n_parts, n_parts // touched)}
+        masks = time_call(add_stock_masks, df.copy(), deltas, repeat=1)
+        # The hash table is built lazily on the first lookup, so time one lookup with it
+        build = time_call(lambda: build_part_index(df).get_indexer(['Part 0']))
+        part_index = build_part_index(df)
+        indexed = time_call(add_stock, df, part_index, deltas)
+        print(f"{n_parts:>8} {masks * 1e3:>11.1f} {build * 1e3:>17.2f} {indexed * 1e3:>13.2f}")
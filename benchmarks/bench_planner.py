@@ -0,0 +1,23 @@
+"""Time the production planner's exact ILP path against the LP-relaxation and greedy fallbacks.
+
+Run from the repository root:  python -m benchmarks.bench_planner
+"""
+import time
+
+from benchmarks.synthetic import make_catalogue
+from planner import plan_production
+
+
+if __name__ == '__main__':
+    print(f"{'models':>6} {'parts':>7} {'method':>7} {'time (s)':>9} {'objective':>10}")
+    for n_models in (3, 10):
+        models = [f"Model {j}" for j in range(n_models)]
+        for n_parts in (10_000, 50_000):
+            df, parts_requirements = make_catalogue(n_parts, models=models, density=0.3,
+                                                     min_stock=2_000, max_stock=20_000)
+            weights = {model: 1 + j % 4 for j, model in enumerate(models)}
+            for method in ('ilp', 'lp', 'greedy'):
+                start = time.perf_counter()
+                result = plan_production(df['Parts'], df['Stock'], parts_requirements, weights, method=method)
+                elapsed = time.perf_counter() - start
+                print(f"{n_models:>6} {n_parts:>7} {result['method']:>7} {elapsed:>9.3f} {result['objective']:>10.0f}")
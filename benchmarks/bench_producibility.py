@@ -0,0 +1,41 @@
+"""Compare the vectorized producibility engine with the old iterrows loop.
+
+Run from the repository root:  python -m benchmarks.bench_producibility
+"""
+import time
+
+from benchmarks.synthetic import make_catalogue
+from producibility import calculate_producible
+
+
+# The per-row loop main.py used before the vectorized engine, kept as the reference
+def calculate_producible_loop(df, parts_requirements):
+    for model, requirements in parts_requirements.items():
+        column_name = f"{model}s that can be made"
+        if column_name not in df.columns:
+            df[column_name] = 0
+        for index, row in df.iterrows():
+            part = row['Parts']
+            stock_qty = int(row['Stock'])
+            if part in requirements:
+                qty = int(requirements[part])
+                producible = stock_qty // qty if qty > 0 else 0
+                df.at[index, column_name] = producible
+    return df
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print(f"{'parts':>8} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    for n_parts in (1_000, 10_000, 100_000):
+        df, parts_requirements = make_catalogue(n_parts)
+        loop = time_call(calculate_producible_loop, df.copy(), parts_requirements)
+        vectorized = time_call(calculate_producible, df.copy(), parts_requirements)
+        assert calculate_producible_loop(df.copy(), parts_requirements).equals(
+            calculate_producible(df.copy(), parts_requirements))
+        print(f"{n_parts:>8} {loop:>10.3f} {vectorized:>15.4f} {loop / vectorized:>7.0f}x")
@@ -0,0 +1,62 @@
+"""What-if scenario throughput against the number of worker processes, with the requirement matrix in shared memory.
+
+Every scenario is a full-catalogue delta vector: producible counts and per-model minimums are recomputed over all
+parts for each one. Times exclude pool start-up (reported separately); results are checked against an in-process
+recompute. Speedup is relative to one worker, so the pool's own overhead does not flatter it.
+
+Run from the repository root:  python -m benchmarks.bench_scenarios
+"""
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_catalogue
+from producibility import build_requirement_matrix, buildable_counts, producible_matrix
+from scenarios import ScenarioEvaluator, available_cores
+
+
+# Function to generate shipments: each scenario receives a few hundred random parts
+def make_scenarios(n_scenarios, n_parts, parts_per_shipment=300, seed=2):
+    rng = np.random.default_rng(seed)
+    deltas = np.zeros((n_scenarios, n_parts), dtype=np.int32)
+    for row in deltas:
+        row[rng.choice(n_parts, parts_per_shipment, replace=False)] = rng.integers(1, 500, parts_per_shipment)
+    return deltas
+
+
+# Function to evaluate scenarios one by one in this process, as the reference
+def evaluate_serial(parts, stock, parts_requirements, deltas):
+    _, matrix = build_requirement_matrix(parts, parts_requirements)
+    stock = np.asarray(stock, dtype=np.int64)
+    return np.array([buildable_counts(producible_matrix(stock + delta, matrix), matrix) for delta in deltas])
+
+
+if __name__ == '__main__':
+    n_parts, n_scenarios = 100_000, 256
+    df, parts_requirements = make_catalogue(n_parts)
+    deltas = make_scenarios(n_scenarios, n_parts)
+
+    start = time.perf_counter()
+    expected = evaluate_serial(df['Parts'], df['Stock'], parts_requirements, deltas)
+    serial = time.perf_counter() - start
+
+    cores = available_cores()
+    worker_counts = sorted({1, 2, 4, 8, 16, 32, cores} & set(range(1, cores + 1)))
+    print(f"{n_parts} parts, {n_scenarios} scenarios, {cores} core(s); in-process serial {serial:.2f}s "
+          f"({n_scenarios / serial:.0f} scenarios/s)")
+    print(f"{'workers':>7} {'start-up (s)':>12} {'seconds':>8} {'scenarios/s':>11} {'speedup':>8} {'efficiency':>10}")
+    one_worker = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        with ScenarioEvaluator(df['Parts'], df['Stock'], parts_requirements, workers) as evaluator:
+            # Warm every worker: spawn, imports and the shared memory mapping
+            evaluator.evaluate(deltas[:workers], chunk_size=1)
+            startup = time.perf_counter() - start
+            start = time.perf_counter()
+            counts = evaluator.evaluate(deltas)
+            elapsed = time.perf_counter() - start
+        assert (counts.to_numpy() == expected).all()
+        one_worker = one_worker or elapsed
+        print(f"{workers:>7} {startup:>12.2f} {elapsed:>8.2f} {n_scenarios / elapsed:>11.0f} "
+              f"{one_worker / elapsed:>7.2f}x {one_worker / elapsed / workers:>10.0%}")
+    print("Results match the in-process recompute")
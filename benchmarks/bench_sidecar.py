@@ -0,0 +1,36 @@
+"""Startup load time: parsing the xlsx vs. the memory-mapped Arrow sidecar written next to it.
+
+Run from the repository root:  python -m benchmarks.bench_sidecar
+"""
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_catalogue
+from sidecar import pa, read_sidecar, write_sidecar
+from workbook_cache import _file_key
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    if pa is None:
+        raise SystemExit("pyarrow is not installed; the sidecar is disabled")
+    print(f"{'parts':>8} {'xlsx (s)':>9} {'sidecar (s)':>12} {'speedup':>8} {'xlsx MB':>8} {'arrow MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_parts in (1_000, 10_000, 100_000):
+            path = os.path.join(tmp, f'{n_parts}.xlsx')
+            make_catalogue(n_parts)[0].to_excel(path, index=False)
+            key = _file_key(path)
+            parsed, xlsx_time = timed(pd.read_excel, path)
+            write_sidecar(path, parsed, key)
+            loaded, sidecar_time = timed(read_sidecar, path, key)
+            assert loaded is not None and loaded.equals(parsed)
+            print(f"{n_parts:>8} {xlsx_time:>9.3f} {sidecar_time:>12.4f} {xlsx_time / sidecar_time:>7.0f}x "
+                  f"{os.path.getsize(path) / 1e6:>8.1f} {os.path.getsize(path + '.arrow') / 1e6:>9.1f}")
@@ -0,0 +1,91 @@
+"""Memory of the stock data: a generic pandas frame (int64 columns) with its part-name index vs. the compact
+StockTable, and the memory a rerun allocates for the displayed table: a column-selection copy vs. a zero-copy view.
+
+Also reports the whole StockState per part, producibility and band indexes included.
+Memory is measured with tracemalloc, which sees numpy and pandas buffers as well as Python objects, plus
+pyarrow's allocator, which holds the Arrow-backed strings pandas 3 uses for text columns. Each structure is
+built from its own freshly loaded catalogue, so buffers shared with the input are counted too.
+
+Under pandas 3 a column selection is copy-on-write and allocates almost nothing either; the views matter there
+for keeping the display frame on the table's int32 arrays instead of a widened copy.
+
+Run from the repository root:  python -m benchmarks.bench_stock_memory
+"""
+import gc
+import tracemalloc
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from benchmarks.synthetic import make_catalogue
+from part_index import build_part_index
+from producibility import calculate_producible
+from stock_arrays import StockTable
+
+PRINT_COLUMNS = ["Parts", "Stock", "Required per vehicle", "E-Rickshaws that can be made", "Round Model", "Loader",
+                 "Flexi Model"]
+
+
+# Function to count the bytes held by pyarrow's allocator, which tracemalloc does not see
+def arrow_bytes():
+    return pa.total_allocated_bytes() if pa is not None else 0
+
+
+# Function to measure the bytes func's result keeps alive and the peak bytes allocated while building it
+def measure(func):
+    gc.collect()
+    arrow_start = arrow_bytes()
+    tracemalloc.start()
+    try:
+        result = func()
+        gc.collect()
+        held, peak = tracemalloc.get_traced_memory()
+        arrow_held = arrow_bytes() - arrow_start
+        return result, held + arrow_held, peak + arrow_held
+    finally:
+        tracemalloc.stop()
+
+
+# Function to read a catalogue the way a workbook load does: every part name its own string object
+def loaded_frame(n_parts):
+    df, parts_requirements = make_catalogue(n_parts)
+    df['Parts'] = [''.join(name) for name in df['Parts']]
+    return df, parts_requirements
+
+
+def generic_frame(df, parts_requirements):
+    frame = calculate_producible(df.copy(), parts_requirements)
+    frame["E-Rickshaws that can be made"] = frame["Stock"] // frame["Required per vehicle"].astype(int)
+    return frame
+
+
+# Function to build the generic frame together with the part index its stock updates look parts up in,
+# the same name lookup StockTable carries
+def indexed_frame(df, parts_requirements):
+    frame = generic_frame(df, parts_requirements)
+    part_index = build_part_index(frame)
+    part_index.get_indexer(part_index[:1])
+    return frame, part_index
+
+
+if __name__ == '__main__':
+    from stock_core import StockState
+
+    n_parts = 100_000
+    parts_requirements = loaded_frame(n_parts)[1]
+    (frame, _), frame_held, _ = measure(lambda: indexed_frame(loaded_frame(n_parts)[0], parts_requirements))
+    table, table_held, _ = measure(lambda: StockTable(generic_frame(loaded_frame(n_parts)[0], parts_requirements)))
+    state, state_held, _ = measure(lambda: StockState(loaded_frame(n_parts)[0], parts_requirements))
+    _, copy_held, copy_peak = measure(lambda: frame[PRINT_COLUMNS])
+    _, view_held, view_peak = measure(lambda: table.frame(PRINT_COLUMNS))
+
+    print(f"{n_parts} parts")
+    print(f"{'stock data':>28} {'bytes/part':>11} {'MB':>7}")
+    print(f"{'pandas frame + index, int64':>28} {frame_held / n_parts:>11.0f} {frame_held / 1e6:>7.1f}")
+    print(f"{'StockTable, int32':>28} {table_held / n_parts:>11.0f} {table_held / 1e6:>7.1f}")
+    print(f"{'StockState, indexes incl.':>28} {state_held / n_parts:>11.0f} {state_held / 1e6:>7.1f}")
+    print(f"{'displayed table per rerun':>28} {'held MB':>11} {'peak MB':>7}")
+    print(f"{'column-selection copy':>28} {copy_held / 1e6:>11.2f} {copy_peak / 1e6:>7.2f}")
+    print(f"{'zero-copy view':>28} {view_held / 1e6:>11.2f} {view_peak / 1e6:>7.2f}")
@@ -0,0 +1,30 @@
+"""Compare Excel and SQLite storage backends for loads and single-part stock changes.
+
+Run from the repository root:  python -m benchmarks.bench_storage
+"""
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import make_catalogue
+from storage import ExcelStorage, SQLiteStorage
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print(f"{'parts':>8} {'backend':>8} {'load (s)':>10} {'1-part save (s)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_parts in (1_000, 10_000, 50_000):
+            df, _ = make_catalogue(n_parts)
+            for name, storage in (('excel', ExcelStorage(os.path.join(tmp, f'{n_parts}.xlsx'))),
+                                  ('sqlite', SQLiteStorage(os.path.join(tmp, f'{n_parts}.db')))):
+                storage.save(df)
+                load = time_call(storage.load)
+                df.loc[0, 'Stock'] += 1
+                save = time_call(storage.save_parts, df, [df.loc[0, 'Parts']])
+                print(f"{n_parts:>8} {name:>8} {load:>10.3f} {save:>16.4f}")
@@ -0,0 +1,70 @@
+"""Render time of the stock table: whole-frame per-cell Styler vs. one sorted, band-coloured page,
+and stock-range filtering by boolean masks vs. the band index.
+
+Times the styling work Streamlit triggers (Styler._compute) plus, for the paged view, the sort and slice.
+
+Run from the repository root:  python -m benchmarks.bench_table_render
+"""
+import time
+
+from benchmarks.synthetic import make_catalogue
+from stock_table import BandIndex, style_page, table_page
+
+COLUMN = "E-Rickshaws that can be made"
+
+
+# The per-cell colouring the stock table used before it was paged
+def highlight_rows(val):
+    if val <= 0:
+        return 'background-color: #8B0000; color: white'
+    elif 1 <= val <= 100:
+        return 'background-color: #FF0000'
+    elif 101 <= val <= 200:
+        return 'background-color: #FFA500'
+    else:
+        return 'background-color: #90EE90'
+
+
+def render_full(df):
+    styler = df.style
+    cell_map = styler.map if hasattr(styler, 'map') else styler.applymap
+    cell_map(highlight_rows, subset=[COLUMN])._compute()
+
+
+def render_page(df, bands, page_size, sort_by):
+    style_page(table_page(df, page=3, page_size=page_size, sort_by=sort_by), bands, COLUMN)._compute()
+
+
+# The mask filter the stock range radio used before the band index
+def filter_masks(df):
+    quantity = df[COLUMN]
+    for mask in (df['Stock'] < 0, quantity <= 100, (quantity > 100) & (quantity <= 200), quantity > 200):
+        df[mask]
+
+
+def filter_bands(df, bands):
+    for label in bands.labels:
+        bands.select(df, label)
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    print(f"{'rows':>8} {'view':>24} {'time (ms)':>10}")
+    for n_parts in (10_000, 100_000):
+        df, _ = make_catalogue(n_parts)
+        df[COLUMN] = df['Stock'] // df['Required per vehicle']
+        bands = BandIndex(df.index, df[COLUMN].to_numpy())
+        print(f"{n_parts:>8} {'full frame, per cell':>24} {timed(render_full, df, repeat=1) * 1e3:>10.1f}")
+        for page_size, sort_by in ((100, None), (100, 'Stock'), (1000, 'Stock')):
+            view = f"page {page_size}" + (f", sort {sort_by}" if sort_by else "")
+            print(f"{n_parts:>8} {view:>24} {timed(render_page, df, bands, page_size, sort_by) * 1e3:>10.1f}")
+        print(f"{n_parts:>8} {'4 filters, masks':>24} {timed(filter_masks, df) * 1e3:>10.1f}")
+        print(f"{n_parts:>8} {'4 filters, band index':>24} {timed(filter_bands, df, bands) * 1e3:>10.1f}")
@@ -0,0 +1,109 @@
+"""Kill a process mid-flush, over and over, and check the stored stock is never left half-written.
+
+A child process streams stock changes with mixed reasons and models through a WriteBehindQueue onto the Excel
+or journal backend, printing a checkpoint before and after every flush. The parent SIGKILLs it at a random
+moment, then checks the stock still loads with every part present, and that its total is the last completed
+flush or the one in progress.
+
+Run from the repository root:  python -m benchmarks.kill_flush [--rounds 20] [--parts 20000] [--backend excel]
+"""
+import argparse
+import glob
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_catalogue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (reason, model, sign) of the changes the child submits; one flush carries several of them
+CHANGES = [('received', None, 1), ('used', 'Round Model', -1), ('used', 'Loader', -1), ('adjusted', None, 1)]
+
+
+# Function to open the backend under test on a workbook path
+def open_storage(path, backend):
+    from storage import ExcelStorage
+    if backend == 'journal':
+        from journal import JournalStorage
+        return JournalStorage(ExcelStorage(path), path + '.journal.csv', path + '.snapshot.json')
+    return ExcelStorage(path)
+
+
+def child(path, backend, seed):
+    from write_behind import WriteBehindQueue
+    storage = open_storage(path, backend)
+    # Only the explicit flushes write, so every write lies between two checkpoints
+    queue = WriteBehindQueue(storage, max_delay=3600)
+    parts = storage.load()['Parts'].tolist()
+    rng = random.Random(seed)
+    submitted = 0
+    while True:
+        for _ in range(rng.randint(1, 5)):
+            reason, model, sign = rng.choice(CHANGES)
+            deltas = {part: sign for part in rng.sample(parts, 10)}
+            queue.submit(deltas, reason, model)
+            submitted += sign * len(deltas)
+        print(f"pending {submitted}", flush=True)
+        queue.flush()
+        print(f"done {submitted}", flush=True)
+
+
+def stock_total(path, backend):
+    df = open_storage(path, backend).load()
+    return len(df), int(df['Stock'].sum())
+
+
+# Function to kill a child mid-flush once per round in directory tmp; yields each round's checkpoints, the
+# units that reached storage and the temp files left behind, and raises AssertionError if storage was damaged
+def run(tmp, rounds, parts, backend='excel', wait=(1.0, 4.0), seed=0):
+    path = os.path.join(tmp, 'stock.xlsx')
+    make_catalogue(parts)[0].to_excel(path, index=False)
+    rows, total = stock_total(path, backend)
+    rng = random.Random(seed)
+    for round_number in range(rounds):
+        log_path = os.path.join(tmp, 'child.log')
+        with open(log_path, 'w') as log:
+            process = subprocess.Popen([sys.executable, '-m', 'benchmarks.kill_flush', '--child', path, backend,
+                                        str(round_number)], stdout=log, cwd=ROOT)
+            time.sleep(rng.uniform(*wait))
+            process.send_signal(signal.SIGKILL)
+            process.wait()
+        checkpoints = {'pending': 0, 'done': 0}
+        for line in open(log_path):
+            state, count = line.split()
+            checkpoints[state] = int(count)
+        new_rows, new_total = stock_total(path, backend)
+        assert new_rows == rows, f"round {round_number}: {new_rows} rows, expected {rows}"
+        written = new_total - total
+        # The flush in progress at the kill either landed whole or not at all
+        assert written in (checkpoints['done'], checkpoints['pending']), \
+            f"round {round_number}: {written} units written, checkpoints {checkpoints}"
+        leftovers = glob.glob(os.path.join(tmp, 'tmp*')) + glob.glob(os.path.join(tmp, '*.tmp'))
+        for leftover in leftovers:
+            os.remove(leftover)
+        total = new_total
+        yield checkpoints, written, leftovers
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--parts', type=int, default=20_000)
+    parser.add_argument('--backend', choices=['excel', 'journal'], default='excel')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for round_number, (checkpoints, written, leftovers) in enumerate(run(tmp, args.rounds, args.parts,
+                                                                             args.backend)):
+            print(f"round {round_number:>3}: killed after {checkpoints['done']} units flushed, stock intact, "
+                  f"{'in-flight flush landed' if written != checkpoints['done'] else 'in-flight flush discarded'}, "
+                  f"{len(leftovers)} temp file(s) cleaned up")
+        print(f"{args.rounds} kills, stock never half-written")
@@ -0,0 +1,100 @@
+"""Many simulated sessions against the shared stock store: memory and rerun latency as sessions grow.
+
+Each session is a thread doing what a rerun of main.py does with the stock (snapshot, filter by band, render a
+page, explain shortages) and now and then recording a receipt through the store. Memory is compared with
+every session holding its own private StockState, as before the shared store. Afterwards the stored stock
+is checked against the receipts every session made.
+
+Run from the repository root:  python -m benchmarks.load_sessions [--parts 20000] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import make_catalogue
+
+COLUMN = "E-Rickshaws that can be made"
+
+
+def rerun(store, stock_table, rng):
+    state = store.snapshot()
+    bands = state.bands[COLUMN]
+    filtered = bands.select(state.df, rng.choice(bands.labels))
+    page = stock_table.table_page(filtered, 1, 100, 'Stock')
+    stock_table.style_page(page, bands, COLUMN)._compute()
+    state.shortages(rng.choice(list(state.parts_requirements)), rng.randint(1, 50))
+
+
+def session(store, stock_core, stock_table, seconds, seed, latencies, received):
+    rng = random.Random(seed)
+    parts = store.snapshot().df['Parts'].tolist()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if rng.random() < 0.1:
+            part = rng.choice(parts)
+            store.mutate(stock_core.increment_stock, [part], 1)
+            received[part] = received.get(part, 0) + 1
+        rerun(store, stock_table, rng)
+        latencies.append(time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parts', type=int, default=20_000)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 20, 50])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    make_catalogue(args.parts, min_stock=0)[0].to_excel(os.path.join(tmp, 'Stock3.xlsx'), index=False)
+    # stock_core opens its files relative to the working directory
+    os.chdir(tmp)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('STOCK_BACKEND', 'journal')
+    import stock_core
+    import stock_table
+    from stock_store import get_store
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    private = [stock_core.load_stock_state() for _ in range(max(args.sessions))]
+    private_bytes = (tracemalloc.get_traced_memory()[0] - baseline) / len(private)
+    del private
+    baseline = tracemalloc.get_traced_memory()[0]
+    store = get_store()
+    shared_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    initial = store.snapshot().df.set_index('Parts')['Stock']
+    total_received = {}
+    print(f"{'sessions':>8} {'private MB':>11} {'shared MB':>10} {'reruns/s':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    for n_sessions in args.sessions:
+        latencies, receipts = [], [{} for _ in range(n_sessions)]
+        threads = [threading.Thread(target=session, args=(store, stock_core, stock_table, args.seconds, seed,
+                                                          latencies, receipts[seed]))
+                   for seed in range(n_sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for received in receipts:
+            for part, quantity in received.items():
+                total_received[part] = total_received.get(part, 0) + quantity
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1e3
+        print(f"{n_sessions:>8} {private_bytes * n_sessions / 1e6:>11.1f} {shared_bytes / 1e6:>10.1f} "
+              f"{len(latencies) / args.seconds:>9.0f} {p50:>7.1f} {p95:>7.1f}")
+
+    stored = stock_core.load_stock_data().set_index('Parts')['Stock']
+    published = store.snapshot().df.set_index('Parts')['Stock']
+    for part, quantity in total_received.items():
+        assert stored[part] == initial[part] + quantity == published[part], part
+    print(f"{sum(total_received.values())} receipts from all sessions, none lost; "
+          f"store reloaded {store.reloads} time(s)")
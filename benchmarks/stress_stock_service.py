@@ -0,0 +1,72 @@
+"""Fire concurrent stock deltas from many processes and check that no update is lost.
+
+Run from the repository root:  python -m benchmarks.stress_stock_service [--backend sqlite|excel|journal]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from multiprocessing import Pool
+
+from benchmarks.synthetic import make_catalogue
+from stock_service import apply_stock_deltas
+from storage import get_storage
+
+
+def open_storage(backend, tmp):
+    storage = get_storage(backend, os.path.join(tmp, 'stock.xlsx'), os.path.join(tmp, 'stock.db'),
+                          os.path.join(tmp, 'journal.csv'), os.path.join(tmp, 'snapshot.json'))
+    if backend == 'journal':
+        # Small threshold so compaction runs many times during the test
+        storage.compact_bytes = 20_000
+    return storage
+
+
+def worker(args):
+    backend, tmp, parts, n_ops, seed = args
+    storage = open_storage(backend, tmp)
+    rng = random.Random(seed)
+    applied = {}
+    for _ in range(n_ops):
+        deltas = {part: rng.randint(-5, 5) for part in rng.sample(parts, 3)}
+        apply_stock_deltas(storage, deltas)
+        for part, delta in deltas.items():
+            applied[part] = applied.get(part, 0) + delta
+    return applied
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', choices=('sqlite', 'excel', 'journal'), default='sqlite')
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=500, help='operations per process')
+    parser.add_argument('--parts', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = open_storage(args.backend, tmp)
+        df, _ = make_catalogue(args.parts)
+        storage.save(df)
+        initial = dict(zip(df['Parts'], df['Stock'].astype(int)))
+        parts = list(initial)
+
+        start = time.perf_counter()
+        with Pool(args.processes) as pool:
+            results = pool.map(worker, [(args.backend, tmp, parts, args.ops, seed)
+                                        for seed in range(args.processes)])
+        elapsed = time.perf_counter() - start
+
+        expected = dict(initial)
+        for applied in results:
+            for part, delta in applied.items():
+                expected[part] += delta
+        final = storage.load()
+        actual = dict(zip(final['Parts'], final['Stock'].astype(int)))
+        lost = {part: (expected[part], actual[part]) for part in parts if expected[part] != actual[part]}
+
+        total_ops = args.processes * args.ops
+        print(f"{args.backend}: {total_ops} operations in {elapsed:.2f}s ({total_ops / elapsed:.0f} ops/s)")
+        if lost:
+            raise SystemExit(f"Lost updates on {len(lost)} parts: {lost}")
+        print("Final stock matches the sum of all deltas")
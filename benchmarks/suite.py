@@ -0,0 +1,189 @@
+"""Full request-cycle benchmark on synthetic catalogues, checked against a baseline file.
+
+Each catalogue size runs in a fresh process from a generated Stock3.xlsx-shaped workbook and times: cold load,
+calculate_producible, building the StockState, every stock range filter, rendering a table page, explaining
+shortages, each mutation function, and a full save. It reports seconds, throughput and peak memory (RSS).
+
+Timings are compared relative to the machine: each run also times a fixed numpy/pandas calibration workload,
+and baseline timings are scaled by how much faster or slower that workload ran than when the baseline was
+recorded. Any step slower than --tolerance times its scaled baseline, or a peak RSS above --rss-tolerance
+times the baseline's, fails the run with exit status 1.
+
+Run from the repository root:
+    python -m benchmarks.suite                     # compare with benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline   # record new baseline numbers on this machine
+    python -m benchmarks.suite --parts 5000 --models 6 --density 0.3 --backend excel
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+COLUMN = "E-Rickshaws that can be made"
+
+
+# Function to run func repeat times and return (best seconds, last result)
+def best_of(func, *args, repeat=1):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# Function to time a fixed workload of the kind the request cycle does (sorting, integer division, grouping);
+# the ratio between two machines' results scales the baseline timings
+def calibrate():
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    values = rng.integers(-50, 1000, 1_000_000)
+    keys = pd.Series(rng.integers(0, 1000, 1_000_000))
+
+    def workload():
+        np.sort(values)
+        values // np.where(values > 0, values, 1)
+        pd.Series(values).groupby(keys).sum()
+
+    return best_of(workload, repeat=5)[0]
+
+
+# Function to run one request cycle in this process; returns step -> (seconds, items handled)
+def run_cycle(n_parts, mutations):
+    import stock_core
+    import stock_table
+    from producibility import calculate_producible
+
+    steps = {}
+    seconds, df = best_of(stock_core.load_stock_data)
+    steps['load'] = (seconds, len(df))
+    parts_requirements = stock_core.load_parts_requirements()
+    seconds, _ = best_of(calculate_producible, df.copy(), parts_requirements, repeat=3)
+    steps['calculate_producible'] = (seconds, n_parts)
+    seconds, state = best_of(stock_core.StockState, df, parts_requirements)
+    steps['build_state'] = (seconds, n_parts)
+
+    bands = state.bands[COLUMN]
+    seconds, _ = best_of(lambda: [bands.select(state.df, label) for label in bands.labels], repeat=3)
+    steps['apply_stock_filter'] = (seconds, len(bands.labels))
+    seconds, _ = best_of(lambda: stock_table.style_page(stock_table.table_page(state.df, 1, 100, 'Stock'), bands,
+                                                      COLUMN)._compute(), repeat=3)
+    steps['render_page'] = (seconds, 1)
+    model = next(iter(parts_requirements))
+    seconds, _ = best_of(state.shortages, model, 10, repeat=3)
+    steps['shortages'] = (seconds, 1)
+
+    parts = state.df['Parts'].tolist()
+    operations = {
+        'increment_stock': lambda i: stock_core.increment_stock(state, parts[i % len(parts):][:5], 3),
+        'decrement_custom_stock': lambda i: stock_core.decrement_custom_stock(state, parts[i % len(parts):][:5], 1),
+        'decrement_stock': lambda i: stock_core.decrement_stock(state, 1, model),
+        'record_production_batch': lambda i: stock_core.record_production_batch(
+            state, {name: 1 for name in parts_requirements}),
+    }
+    for name, operation in operations.items():
+        # Best single call, as for the other steps; each call writes to storage
+        seconds = min(best_of(operation, i * 7)[0] for i in range(mutations))
+        steps[name] = (seconds, 1)
+    if stock_core.write_queue is not None:
+        stock_core.write_queue.flush()
+
+    seconds, _ = best_of(stock_core.save_stock_data, state.df, repeat=3)
+    steps['save'] = (seconds, n_parts)
+    return steps
+
+
+def child(args):
+    from benchmarks.synthetic import make_workbook, model_names
+    os.chdir(args.child)
+    make_workbook('Stock3.xlsx', args.parts[0], args.models, args.density, args.seed)
+    # stock_core opens its files relative to the working directory and reads its models from the
+    # environment, so import it only now
+    os.environ['STOCK_MODELS'] = ','.join(model_names(args.models))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    calibration = calibrate()
+    steps = run_cycle(args.parts[0], args.mutations)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    print(json.dumps({'steps': steps, 'peak_rss_bytes': peak, 'calibration_seconds': calibration}))
+
+
+def config_key(n_parts, args):
+    return f"{args.backend}/parts={n_parts}/models={args.models}/density={args.density}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parts', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--models', type=int, default=3)
+    parser.add_argument('--density', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mutations', type=int, default=20)
+    parser.add_argument('--backend', choices=('journal', 'excel', 'sqlite'), default='journal')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=2.0, help='fail when a step takes this many times '
+                                                                     'its scaled baseline (default 2.0)')
+    parser.add_argument('--rss-tolerance', type=float, default=1.25, help='fail when peak RSS is this many times '
+                                                                          'the baseline (default 1.25)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        sys.exit()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = []
+    for n_parts in args.parts:
+        key = config_key(n_parts, args)
+        with tempfile.TemporaryDirectory() as tmp:
+            # Synchronous writes, so mutation timings include the storage write
+            env = dict(os.environ, STOCK_BACKEND=args.backend, STOCK_WRITE_BEHIND='0')
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.suite', '--child', tmp, '--parts', str(n_parts),
+                                     '--models', str(args.models), '--density', str(args.density),
+                                     '--seed', str(args.seed), '--mutations', str(args.mutations)],
+                                    env=env, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        recorded = baseline.get(key, {})
+        expected = recorded.get('steps', {})
+        # Baseline timings scaled to this machine's speed, when the baseline recorded its calibration
+        scale = (result['calibration_seconds'] / recorded['calibration_seconds']
+                 if recorded.get('calibration_seconds') else 1.0)
+        peak_rss, base_rss = result['peak_rss_bytes'], recorded.get('peak_rss_bytes')
+        rss_regressed = base_rss is not None and peak_rss > base_rss * args.rss_tolerance
+        if rss_regressed:
+            regressions.append(f"{key} peak RSS: {peak_rss / 1e6:.0f} MB vs baseline {base_rss / 1e6:.0f} MB")
+        print(f"\n{key}  (peak RSS {peak_rss / 1e6:.0f} MB"
+              f"{f', baseline {base_rss / 1e6:.0f} MB' if base_rss is not None else ''}"
+              f"{'  REGRESSION' if rss_regressed else ''}; machine speed x{1 / scale:.2f} of baseline)")
+        print(f"{'step':>24} {'seconds':>9} {'per second':>11} {'baseline':>9} {'ratio':>6}")
+        for step, (seconds, items) in result['steps'].items():
+            base = expected.get(step, [None])[0]
+            base = base * scale if base is not None else None
+            ratio = seconds / base if base else None
+            # A few milliseconds of jitter on tiny steps is noise, not a regression
+            regressed = base is not None and seconds > base * args.tolerance and seconds - base > 0.002
+            if regressed:
+                regressions.append(f"{key} {step}: {seconds:.4f}s vs baseline {base:.4f}s")
+            print(f"{step:>24} {seconds:>9.4f} {items / seconds:>11,.0f} "
+                  f"{base if base is not None else float('nan'):>9.4f} "
+                  f"{ratio if ratio is not None else float('nan'):>6.2f}{'  REGRESSION' if regressed else ''}")
+        baseline[key] = result
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+    elif regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from producibility import calculate_producible
+
+MODELS = ["Round Model", "Loader", "Flexi Model"]
+
+
+# Function to generate a synthetic stock table and requirements dict shaped like Stock3.xlsx
+def make_catalogue(n_parts, models=MODELS, density=0.8, seed=0, min_stock=-50, max_stock=1000):
+    rng = np.random.default_rng(seed)
+    parts = [f"Part {i}" for i in range(n_parts)]
+    df = pd.DataFrame({
+        'Parts': parts,
+        'Stock': rng.integers(min_stock, max_stock, n_parts),
+        'Required per vehicle': rng.integers(1, 5, n_parts),
+    })
+    parts_requirements = {}
+    for model in models:
+        qty = rng.integers(1, 5, n_parts) * (rng.random(n_parts) < density)
+        df[model] = qty
+        parts_requirements[model] = dict(zip(parts, qty.tolist()))
+    return df, parts_requirements
+
+
+# Function to name n models: the real three first, then numbered extras
+def model_names(n_models):
+    return (MODELS + [f"Model {i}" for i in range(len(MODELS) + 1, n_models + 1)])[:n_models]
+
+
+# Function to write a synthetic workbook laid out like Stock3.xlsx, computed columns after the model columns;
+# models beyond the real three need STOCK_MODELS set to model_names(n_models). Returns its requirements dict
+def make_workbook(path, n_parts, n_models=3, density=0.8, seed=0):
+    df, parts_requirements = make_catalogue(n_parts, model_names(n_models), density, seed)
+    df = calculate_producible(df, parts_requirements)
+    df["E-Rickshaws that can be made"] = df["Stock"] // df["Required per vehicle"]
+    df.to_excel(path, index=False)
+    return parts_requirements
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import pandas as pd
+
+from workbook_cache import read_workbook
+
+# Per-assembly leaf expansions, kept until the BOM workbook changes on disk
+_expansions = {'version': None, 'bom': {}, 'memo': {}}
+_lock = threading.Lock()
+
+
+# Function to load assembly -> {component: quantity} from a BOM workbook with Assembly, Component, Quantity columns
+def load_bom(path):
+    df = read_workbook(path)
+    missing = {'Assembly', 'Component', 'Quantity'} - set(df.columns)
+    if missing:
+        raise ValueError(f"BOM sheet is missing column(s): {', '.join(sorted(missing))}")
+    df = df.dropna(subset=['Assembly', 'Component', 'Quantity'])
+    bom = {}
+    for assembly, component, quantity in zip(df['Assembly'], df['Component'], df['Quantity']):
+        components = bom.setdefault(assembly, {})
+        components[component] = components.get(component, 0) + int(quantity)
+    return bom
+
+
+# Function to expand an assembly into leaf-part quantities, memoized per assembly; raises ValueError on a cycle
+def expand_assembly(assembly, bom, memo, visiting=()):
+    if assembly in memo:
+        return memo[assembly]
+    if assembly in visiting:
+        cycle = visiting[visiting.index(assembly):] + (assembly,)
+        raise ValueError(f"BOM cycle: {' -> '.join(map(str, cycle))}")
+    leaves = {}
+    for component, quantity in bom[assembly].items():
+        if component in bom:
+            for leaf, leaf_quantity in expand_assembly(component, bom, memo, visiting + (assembly,)).items():
+                leaves[leaf] = leaves.get(leaf, 0) + quantity * leaf_quantity
+        else:
+            leaves[component] = leaves.get(component, 0) + quantity
+    memo[assembly] = leaves
+    return leaves
+
+
+# Function to get the BOM and its expansions, reloading and re-validating only when the file changed
+def bom_expansions(path):
+    stat = os.stat(path)
+    version = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _expansions['version'] != version:
+            bom = load_bom(path)
+            memo = {}
+            # Expanding every assembly up front surfaces cycles as soon as the BOM is loaded
+            for assembly in bom:
+                expand_assembly(assembly, bom, memo)
+            _expansions.update(version=version, bom=bom, memo=memo)
+        return _expansions['bom'], _expansions['memo']
+
+
+# Function to replace sub-assemblies in each model's requirements with the leaf parts they are built from
+def explode_requirements(parts_requirements, bom_path):
+    if not os.path.exists(bom_path):
+        return parts_requirements
+    bom, memo = bom_expansions(bom_path)
+    exploded = {}
+    for model, requirements in parts_requirements.items():
+        demand = {}
+        for part, qty in requirements.items():
+            if pd.isna(qty):
+                continue
+            if part in bom:
+                for leaf, leaf_qty in expand_assembly(part, bom, memo).items():
+                    demand[leaf] = demand.get(leaf, 0) + int(qty) * leaf_qty
+            else:
+                demand[part] = demand.get(part, 0) + int(qty)
+        exploded[model] = demand
+    return exploded
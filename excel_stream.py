@@ -0,0 +1,178 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# Function to yield raw DataFrame batches of a sheet using openpyxl's read-only mode, so the workbook is never fully loaded
+def iter_row_batches(path, batch_size=20_000, sheet=0):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [str(name) if name is not None else f"Unnamed: {i}"
+                  for i, name in enumerate(next(rows, ()))]
+        batch = []
+        yielded = False
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield _to_frame(batch, header)
+                yielded = True
+                batch = []
+        if batch or not yielded:
+            yield _to_frame(batch, header)
+    finally:
+        workbook.close()
+
+
+def _to_frame(rows, header):
+    # Read-only sheets often carry trailing empty rows
+    return pd.DataFrame(rows, columns=header).dropna(how='all')
+
+
+# Function to fix each column's type from the first batch: 'int' for whole numbers, 'float' for fractions,
+# 'text' for anything else; Parts is 'parts', typed from its cell values as pd.read_excel types it
+def batch_schema(batch):
+    schema = {}
+    for name in batch.columns:
+        column = batch[name]
+        numeric = pd.to_numeric(column, errors='coerce')
+        if name == 'Parts':
+            schema[name] = 'parts'
+        elif numeric.notna().sum() == column.notna().sum():
+            schema[name] = 'int' if (numeric.dropna() % 1 == 0).all() else 'float'
+        else:
+            schema[name] = 'text'
+    return schema
+
+
+# Function to turn a whole-number float cell into an int, as pd.read_excel does
+def _cell_value(value):
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+# One column filled batch by batch into a single growing array, so the batches are never all held at once.
+# Numbers are int32 (int64 when they need it) or float32; text is categorical; Parts keeps its cell values.
+# A later batch that does not fit the column's type widens it: whole numbers to fractions, numbers to text
+class ColumnBuilder:
+    def __init__(self, kind, capacity):
+        self.kind = kind
+        self.size = 0
+        self.categories = {}
+        dtype = {'int': np.int32, 'float': np.float32, 'text': np.int32, 'parts': object}[kind]
+        self.values = np.empty(capacity, dtype=dtype)
+        # Which cells of a number column were empty, as an int column holds them as 0; None once the column is text
+        self.empty = np.empty(capacity, dtype=bool) if kind in ('int', 'float') else None
+
+    def append(self, column):
+        empty = None
+        if self.kind in ('int', 'float'):
+            numeric = pd.to_numeric(column, errors='coerce')
+            if numeric.notna().sum() != column.notna().sum():
+                self._widen('text')
+            elif self.kind == 'int' and not (numeric.dropna() % 1 == 0).all():
+                self._widen('float')
+            if self.empty is not None:
+                empty = column.isna().to_numpy()
+        if self.kind == 'int':
+            # Empty quantity cells count as 0, as the requirement and stock checks already treat them
+            values = numeric.fillna(0).to_numpy(dtype=np.int64)
+            if len(values) and np.abs(values).max() >= 2 ** 31 and self.values.dtype == np.int32:
+                self.values = self.values.astype(np.int64)
+        elif self.kind == 'float':
+            values = numeric.to_numpy(dtype=np.float64)
+        elif self.kind == 'text':
+            values = self._codes(column)
+        else:
+            values = np.fromiter(map(_cell_value, column.astype(object)), dtype=object, count=len(column))
+        self._put(values, empty)
+
+    def _put(self, values, empty=None):
+        end = self.size + len(values)
+        if end > len(self.values):
+            grown = np.empty(max(end, 2 * len(self.values)), dtype=self.values.dtype)
+            grown[:self.size] = self.values[:self.size]
+            self.values = grown
+            if self.empty is not None:
+                grown = np.empty(len(self.values), dtype=bool)
+                grown[:self.size] = self.empty[:self.size]
+                self.empty = grown
+        self.values[self.size:end] = values
+        if empty is not None:
+            self.empty[self.size:end] = empty
+        self.size = end
+
+    # Function to map text cells to category codes, -1 for empty cells
+    def _codes(self, column):
+        codes, uniques = pd.factorize(column.astype(object), use_na_sentinel=True)
+        lookup = np.array([self.categories.setdefault(_cell_value(value), len(self.categories))
+                           for value in uniques] + [-1], dtype=np.int32)
+        return lookup[codes]
+
+    # Function to retype the values appended so far
+    def _widen(self, kind):
+        held = self.values[:self.size]
+        empty = self.empty[:self.size]
+        if kind == 'float':
+            self.values = self.values.astype(np.float32 if np.abs(held).max(initial=0) < 2 ** 24 else np.float64)
+            # Empty cells of a float column are missing, not 0
+            self.values[:self.size][empty] = np.nan
+        else:
+            codes = self._codes(pd.Series(held))
+            codes[empty] = -1
+            self.values = np.empty(len(self.values), dtype=np.int32)
+            self.values[:self.size] = codes
+            self.empty = None
+        self.kind = kind
+
+    def finish(self):
+        values = self.values[:self.size]
+        if self.kind == 'text':
+            categories = pd.Index(list(self.categories))
+            return pd.Series(pd.Categorical.from_codes(values, categories=categories))
+        if self.kind == 'parts':
+            # Typed from the values: integers for numeric codes, text for names, object for a mix
+            return pd.Series(list(values))
+        return pd.Series(values.copy() if len(self.values) > self.size else values)
+
+
+# Function to concatenate compact batches, merging categories so text columns stay categorical
+def concat_batches(batches):
+    if len(batches) == 1:
+        return batches[0].reset_index(drop=True)
+    columns = {}
+    for name in batches[0].columns:
+        parts = [batch[name] for batch in batches]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[name] = pd.Series(union_categoricals([part.array for part in parts]))
+        else:
+            columns[name] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+# Function to read a sheet into a compact frame batch by batch, typed by the first batch; fills stats with rows,
+# batches and peak memory
+def read_table(path, batch_size=20_000, stats=None, measure_memory=False):
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        columns = None
+        batches = 0
+        for batch in iter_row_batches(path, batch_size):
+            if columns is None:
+                columns = {name: ColumnBuilder(kind, batch_size) for name, kind in batch_schema(batch).items()}
+            for name, builder in columns.items():
+                builder.append(batch[name])
+            batches += 1
+        table = pd.DataFrame({name: builder.finish() for name, builder in columns.items()})
+        if stats is not None:
+            stats.update(rows=len(table), batches=batches, bytes=int(table.memory_usage(deep=True).sum()))
+            if measure_memory:
+                stats['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        return table
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
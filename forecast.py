@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from journal import part_key
+
+SECONDS_PER_DAY = 86_400
+# Journal reasons that consume stock: production batches and custom decrements
+CONSUMPTION_REASONS = ('production', 'removed')
+# Stock-outs further out than this get no date
+FORECAST_HORIZON_DAYS = 3650
+
+
+# Function to find each value's position in names, -1 if absent; categorical values are looked up per category
+def _positions(names, values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        category_positions = np.append(names.get_indexer(values.cat.categories), -1)
+        # Missing values have code -1, which picks the appended -1
+        return category_positions[values.cat.codes.to_numpy()]
+    return names.get_indexer(values)
+
+
+# Function to compute exponentially weighted daily consumption per part from journal movements;
+# returns (mean, std) arrays aligned to parts, in units per day
+def consumption_rates(movements, parts, now=None, halflife_days=14):
+    parts = pd.Index(parts)
+    names = parts.unique()
+    mean = np.zeros(len(names))
+    second_moment = np.zeros(len(names))
+    consumed = movements[movements['reason'].isin(CONSUMPTION_REASONS) & (movements['delta'] < 0)]
+    # The journal keys parts by their text, numeric part codes included
+    codes = _positions(pd.Index(names.map(part_key), dtype=object), consumed['part'])
+    if len(movements) and (codes >= 0).any():
+        today = int((time.time() if now is None else now) // SECONDS_PER_DAY)
+        # Days with no consumption count as zero use, back to the first recorded movement of any kind
+        first_day = int(np.nanmin(pd.to_numeric(movements['timestamp']).to_numpy()) // SECONDS_PER_DAY)
+        history_days = today - first_day + 1
+        days = np.nan_to_num(pd.to_numeric(consumed['timestamp']).to_numpy(), nan=today * SECONDS_PER_DAY)
+        ages = np.clip(today - (days // SECONDS_PER_DAY).astype(np.int64), 0, history_days - 1)
+        known = codes >= 0
+        # Sum movements into daily totals per part, so the spread is measured across days
+        cells, inverse = np.unique(codes[known] * history_days + ages[known], return_inverse=True)
+        daily = np.bincount(inverse, weights=-consumed['delta'].to_numpy()[known].astype(np.float64))
+        cell_codes, cell_ages = np.divmod(cells, history_days)
+        decay = 0.5 ** (1 / halflife_days)
+        weights = (1 - decay) * decay ** cell_ages
+        total_weight = 1 - decay ** history_days
+        mean = np.bincount(cell_codes, weights=weights * daily, minlength=len(names)) / total_weight
+        second_moment = np.bincount(cell_codes, weights=weights * daily ** 2, minlength=len(names)) / total_weight
+    std = np.sqrt(np.maximum(second_moment - mean ** 2, 0))
+    positions = names.get_indexer(parts)
+    return mean[positions], std[positions]
+
+
+# Function to project stock-out dates and reorder suggestions from daily consumption rates;
+# lead_times is days per part (scalar or array), review_days the stock one order should cover beyond the lead time
+def forecast_stock(parts, stock, mean, std, lead_times, now=None, review_days=30, service_z=1.65):
+    stock = np.asarray(stock, dtype=np.float64)
+    lead_times = np.broadcast_to(np.asarray(lead_times, dtype=np.float64), stock.shape)
+    consuming = mean > 0
+    days_left = np.where(consuming, np.maximum(stock, 0) / np.where(consuming, mean, 1), np.inf)
+    today = pd.Timestamp((time.time() if now is None else now) // SECONDS_PER_DAY * SECONDS_PER_DAY, unit='s')
+    dated = days_left <= FORECAST_HORIZON_DAYS
+    stockout = (today + pd.to_timedelta(np.where(dated, np.floor(days_left), 0), unit='D')).where(dated)
+    # Cover expected use over the lead time plus a safety margin for its variability
+    reorder_point = np.ceil(mean * lead_times + service_z * std * np.sqrt(lead_times))
+    order = np.where(consuming & (stock <= reorder_point),
+                     np.ceil(reorder_point + mean * review_days - stock), 0)
+    return pd.DataFrame({
+        'Parts': np.asarray(parts),
+        'Stock': stock.astype(np.int64),
+        'Daily use': mean.round(2),
+        'Days left': days_left.round(1),
+        'Stock-out date': stockout,
+        'Reorder point': reorder_point.astype(np.int64),
+        'Suggested order': order.astype(np.int64),
+    })
@@ -0,0 +1,164 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# Latency histogram bucket upper bounds in seconds, Prometheus style
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# Set STOCK_INSTRUMENTATION=0 to turn recording off; spans then cost one flag check
+_enabled = os.environ.get('STOCK_INSTRUMENTATION', '1') != '0'
+_histograms = {}
+_lock = threading.Lock()
+
+
+# Latency histogram and row counts of one operation
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.last_rows = None
+
+    def add(self, seconds, rows):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if rows is not None:
+            self.rows += rows
+            self.last_rows = rows
+
+    # Function to estimate a quantile as the upper bound of the bucket it falls in
+    def quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+# Function to record one timed operation directly
+def record(name, seconds, rows=None):
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(seconds, rows)
+
+
+# A timed span; set .rows inside the block to record how many rows the operation handled
+class _Span:
+    __slots__ = ('name', 'rows', 'start')
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start, self.rows)
+        return False
+
+
+# Shared do-nothing span handed out while recording is off
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# Function to time a block: with span('filter') as timing: ...; timing.rows = len(result)
+def span(name, rows=None):
+    return _Span(name, rows) if _enabled else _NULL_SPAN
+
+
+# Decorator timing every call of a function; rows, if given, maps the result to a row count
+def timed(name, rows=None):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            record(name, time.perf_counter() - start, rows(result) if rows is not None else None)
+            return result
+        return wrapper
+    return decorate
+
+
+# Function to summarise every operation: count, mean/p50/p95/max seconds, rows and raw buckets
+def snapshot():
+    with _lock:
+        return {
+            name: {
+                'count': histogram.count,
+                'mean_seconds': histogram.total / histogram.count,
+                'p50_seconds': histogram.quantile(0.5),
+                'p95_seconds': histogram.quantile(0.95),
+                'max_seconds': histogram.max,
+                'rows_total': histogram.rows,
+                'last_rows': histogram.last_rows,
+                'buckets': dict(zip(map(str, BUCKETS), histogram.buckets)),
+            }
+            for name, histogram in sorted(_histograms.items())
+        }
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+# Function to render the histograms in the Prometheus text exposition format
+def to_prometheus(prefix='stock_operation'):
+    lines = [f"# HELP {prefix}_seconds Latency of stock operations.", f"# TYPE {prefix}_seconds histogram"]
+    with _lock:
+        items = sorted(_histograms.items())
+        for name, histogram in items:
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_seconds_bucket{{operation="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_seconds_sum{{operation="{name}"}} {histogram.total}')
+            lines.append(f'{prefix}_seconds_count{{operation="{name}"}} {histogram.count}')
+        lines += [f"# HELP {prefix}_rows_total Rows handled by stock operations.",
+                  f"# TYPE {prefix}_rows_total counter"]
+        lines += [f'{prefix}_rows_total{{operation="{name}"}} {histogram.rows}' for name, histogram in items]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
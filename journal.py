@@ -0,0 +1,309 @@
+import csv
+import glob
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+from pandas.api.types import is_integer_dtype
+
+from excel_stream import concat_batches
+from storage import file_lock, stat_key, StockConflict
+
+JOURNAL_COLUMNS = ['timestamp', 'part', 'delta', 'reason', 'model']
+
+
+# Function to read the complete lines of a journal file from a byte offset
+def _read_lines(path, offset):
+    try:
+        with open(path, 'rb') as journal_file:
+            journal_file.seek(offset)
+            data = journal_file.read()
+    except FileNotFoundError:
+        return b''
+    # Only consume whole lines; a writer may be mid-append
+    return data[:data.rfind(b'\n') + 1]
+
+
+# Function to read movement records from a journal file starting at a byte offset; returns (records, new offset)
+def read_movements(path, offset=0):
+    data = _read_lines(path, offset)
+    if not data:
+        return pd.DataFrame(columns=JOURNAL_COLUMNS), offset
+    records = pd.read_csv(io.BytesIO(data), names=JOURNAL_COLUMNS, header=None, on_bad_lines='skip',
+                          dtype={'part': str, 'reason': str, 'model': str})
+    # A record cut short by a crashed writer has no usable delta; drop it
+    records['delta'] = pd.to_numeric(records['delta'], errors='coerce')
+    records = records.dropna(subset=['part', 'delta']).astype({'delta': 'int64'})
+    return records.reset_index(drop=True), offset + len(data)
+
+
+# Function to sum the deltas per part in a journal from a byte offset; returns (part -> delta, new offset)
+def read_deltas(path, offset=0):
+    data = _read_lines(path, offset)
+    if len(data) > 65536:
+        # Large journals are cheaper to parse and aggregate in pandas
+        records, offset = read_movements(path, offset)
+        return records.groupby('part')['delta'].sum().to_dict(), offset
+    totals = {}
+    for row in csv.reader(io.StringIO(data.decode())):
+        try:
+            totals[row[1]] = totals.get(row[1], 0) + int(row[2])
+        except (IndexError, ValueError):
+            continue
+    return totals, offset + len(data)
+
+
+# Function to get the key a part is stored under: journal lines and snapshot JSON only hold text, so numeric
+# part codes from the catalogue are keyed by their text too
+def part_key(part):
+    return str(part)
+
+
+# Function to key catalogue parts to their stock quantities
+def catalogue_stock(catalogue):
+    return dict(zip(map(part_key, catalogue['Parts']), catalogue['Stock'].astype(int).tolist()))
+
+
+# Function to overlay part key -> quantity on a catalogue's Stock column, keeping a compact integer dtype if it has one
+def merge_stock(catalogue, stock):
+    merged = catalogue['Parts'].map(part_key).astype(object).map(stock).fillna(catalogue['Stock'])
+    return merged.astype(catalogue['Stock'].dtype if is_integer_dtype(catalogue['Stock']) else int)
+
+
+# Function to write a file atomically via temp file and rename
+def write_atomic(path, text):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as tmp_file:
+        tmp_file.write(text)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, path)
+
+
+# Stock kept as a snapshot plus an append-only journal of movements; the workbook supplies the catalogue.
+# The snapshot and journal own Stock: the workbook's Stock column is only read as the opening balance of parts
+# the snapshot has not seen yet (all of them on first use, which writes the first snapshot at once). Later hand
+# edits to Stock in the workbook are ignored and the workbook is never rewritten with current stock; change
+# stock through the app or save(), and get current figures with "stock_cli export-excel"
+class JournalStorage:
+    def __init__(self, catalogue, journal_path, snapshot_path, compact_bytes=1_000_000):
+        self.catalogue = catalogue
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.archive_dir = journal_path + '.archive'
+        self.lock_path = journal_path + '.lock'
+        self.compact_bytes = compact_bytes
+        self._stock = None
+        self._position = None
+        self._compacting = threading.Lock()
+
+    def exists(self):
+        return self.catalogue.exists()
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path) as snapshot_file:
+                return json.load(snapshot_file)
+        except FileNotFoundError:
+            return {'compacted': [], 'stock': {}}
+
+    # Function to identify the stored stock cheaply: appends change the journal, compaction the snapshot, and
+    # edits to the workbook the catalogue and requirements
+    def version(self):
+        return stat_key(self.journal_path), stat_key(self.snapshot_path), self.catalogue.version()
+
+    def _pending_paths(self):
+        return sorted(glob.glob(self.journal_path + '.*.pending'), key=os.path.getmtime)
+
+    # Function to identify the on-disk state we have folded into self._stock
+    def _snapshot_version(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+            return stat.st_mtime_ns, stat.st_ino
+        except FileNotFoundError:
+            return None
+
+    # Rebuild stock from catalogue + snapshot + pending journals + live journal, or just fold in the journal tail
+    def _refresh(self):
+        try:
+            journal_ino = os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            journal_ino = None
+        version = self._snapshot_version()
+        if self._position is not None and self._position[:2] == (version, journal_ino):
+            totals, offset = read_deltas(self.journal_path, self._position[2])
+            self._add(totals)
+            self._position = (version, journal_ino, offset)
+            return
+        stock = catalogue_stock(self.catalogue.load())
+        if version is None:
+            # First use: take the workbook's Stock as the opening balance now, so that editing the workbook later
+            # cannot count movements already journalled on top of it a second time
+            self._write_snapshot(stock, [])
+            version = self._snapshot_version()
+        snapshot = self._read_snapshot()
+        stock.update(snapshot['stock'])
+        self._stock = stock
+        for pending_path in self._pending_paths():
+            if pending_path.split('.')[-2] not in snapshot['compacted']:
+                self._add(read_deltas(pending_path)[0])
+        totals, offset = read_deltas(self.journal_path)
+        self._add(totals)
+        self._position = (version, journal_ino, offset)
+
+    def _add(self, totals):
+        for part, delta in totals.items():
+            self._stock[part] = self._stock.get(part, 0) + int(delta)
+
+    def load(self):
+        with file_lock(self.lock_path, blocking=True):
+            self._refresh()
+            stock = dict(self._stock)
+        df = self.catalogue.load()
+        df['Stock'] = merge_stock(df, stock)
+        return df
+
+    # Replace the whole stock: new catalogue and snapshot, journals it supersedes archived
+    def save(self, df):
+        with file_lock(self.lock_path, blocking=True):
+            self.catalogue.save(df)
+            if os.path.exists(self.journal_path):
+                self._rotate()
+            pending_paths = self._pending_paths()
+            self._write_snapshot(catalogue_stock(df), pending_paths)
+            self._position = None
+
+    def save_parts(self, df, parts):
+        self.save(df)
+
+    # Append one movement record per part; O(1) in the catalogue size. Waits for the lock: a writer holding it
+    # may be re-reading a large catalogue
+    def apply_deltas(self, deltas, reason=None, model=None):
+        with file_lock(self.lock_path, blocking=True):
+            journal_size = self._append([(part, delta, reason, model) for part, delta in deltas.items()])
+            new_stock = {part: self._stock.get(part_key(part), 0) for part in deltas}
+        if journal_size > self.compact_bytes:
+            threading.Thread(target=self.compact, daemon=True).start()
+        return new_stock
+
+    # Function to append movement records [(part, delta, reason, model), ...], e.g. the paired movements of a
+    # location transfer, which leave each part's total unchanged
+    def record_movements(self, records):
+        with file_lock(self.lock_path, blocking=True):
+            journal_size = self._append(records)
+        if journal_size > self.compact_bytes:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    # Function to append records after folding in everyone else's; call with the lock held. Returns the journal size
+    def _append(self, records):
+        timestamp = round(time.time(), 3)
+        self._refresh()
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > self._position[2]:
+            # A crashed writer left a partial line; drop it so our records start cleanly
+            os.truncate(self.journal_path, self._position[2])
+        totals = {}
+        with open(self.journal_path, 'a', newline='') as journal_file:
+            writer = csv.writer(journal_file)
+            for part, delta, reason, model in records:
+                writer.writerow([timestamp, part_key(part), int(delta), reason or '', model or ''])
+                totals[part_key(part)] = totals.get(part_key(part), 0) + int(delta)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+            journal_size = journal_file.tell()
+            journal_ino = os.fstat(journal_file.fileno()).st_ino
+        # We held the lock since _refresh, so everything past our old offset is ours
+        self._add(totals)
+        self._position = (self._position[0], journal_ino, journal_size)
+        return journal_size
+
+    def _rotate(self):
+        pending_path = f"{self.journal_path}.{uuid.uuid4().hex}.pending"
+        os.replace(self.journal_path, pending_path)
+        return pending_path
+
+    def _archive(self, pending_path):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        name = time.strftime('%Y%m%d-%H%M%S-') + os.path.basename(pending_path)[:-len('.pending')]
+        os.replace(pending_path, os.path.join(self.archive_dir, name))
+
+    # Function to write a new snapshot that covers the given pending journals, then archive them
+    def _write_snapshot(self, stock, pending_paths):
+        compacted = [pending_path.split('.')[-2] for pending_path in pending_paths]
+        write_atomic(self.snapshot_path, json.dumps({'compacted': compacted, 'stock': stock}))
+        for pending_path in pending_paths:
+            self._archive(pending_path)
+
+    # Fold the journal into a new snapshot; every step is atomic so a crash never double-counts a movement.
+    # The workbook is left alone: it does not hold current stock
+    def compact(self):
+        if not self._compacting.acquire(blocking=False):
+            return
+        try:
+            with file_lock(self.journal_path + '.compact'):
+                with file_lock(self.lock_path, blocking=True):
+                    if os.path.exists(self.journal_path):
+                        self._rotate()
+                    pending_paths = self._pending_paths()
+                    snapshot = self._read_snapshot()
+                    version = self._snapshot_version()
+                if not pending_paths:
+                    return
+                # Only parts new to the snapshot take their opening balance from the workbook
+                stock = catalogue_stock(self.catalogue.load())
+                stock.update(snapshot['stock'])
+                for pending_path in pending_paths:
+                    if pending_path.split('.')[-2] not in snapshot['compacted']:
+                        for part, delta in read_deltas(pending_path)[0].items():
+                            stock[part] = stock.get(part, 0) + int(delta)
+                with file_lock(self.lock_path, blocking=True):
+                    # A save() in the meantime replaced the stock and archived these journals itself
+                    if self._snapshot_version() == version:
+                        self._write_snapshot(stock, pending_paths)
+        except StockConflict:
+            # Another process is already compacting
+            pass
+        finally:
+            self._compacting.release()
+
+
+# Parsed journal files keyed on path, each with the (mtime, size) it was read at; archived journals never change
+_movement_cache = {}
+_movement_lock = threading.Lock()
+
+
+# Function to list the journal files holding movement history, oldest first, with their (mtime, size)
+def movement_files(storage):
+    # Under the journal lock, so no journal is rotated or archived between the listings
+    with file_lock(storage.lock_path, blocking=True):
+        paths = sorted(glob.glob(os.path.join(storage.archive_dir, '*')))
+        paths += storage._pending_paths() + [storage.journal_path]
+    files = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        files.append((path, (stat.st_mtime_ns, stat.st_size)))
+    return files
+
+
+# Function to read every movement ever recorded: archived journals followed by the live ones
+def load_movements(storage, files=None):
+    files = movement_files(storage) if files is None else files
+    frames = []
+    with _movement_lock:
+        for path, key in files:
+            entry = _movement_cache.get(path)
+            if entry is None or entry[0] != key:
+                # Parts and reasons repeat heavily; categories keep the history compact and fast to group
+                movements = read_movements(path)[0].astype({'part': 'category', 'reason': 'category'})
+                entry = _movement_cache[path] = (key, movements)
+            frames.append(entry[1])
+        # Journals that were archived or rotated away are no longer needed under their old names
+        for path in set(_movement_cache) - {path for path, _ in files}:
+            del _movement_cache[path]
+    return concat_batches(frames) if frames else pd.DataFrame(columns=JOURNAL_COLUMNS)
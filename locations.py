@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from journal import write_atomic
+from storage import file_lock, stat_key
+
+LOCATION_COLUMNS = ['Parts', 'Location', 'Stock']
+
+
+# Function to map part names to the position of their first row in the catalogue, -1 for unknown names
+def _part_positions(parts, names):
+    parts = pd.Index(parts)
+    first = ~parts.duplicated()
+    positions = pd.Index(parts[first]).get_indexer(names)
+    return np.where(positions >= 0, np.flatnonzero(first)[positions], -1)
+
+
+# Stock held per (part, location), kept sparse: only quantities away from the default location are stored,
+# as sorted (part * locations + location) cells; the default location holds the rest of each part's total
+class LocationStock:
+    def __init__(self, parts, locations, table=None):
+        self.parts = pd.Index(parts)
+        self.locations = list(locations)
+        self.default = self.locations[0]
+        if table is None:
+            table = pd.DataFrame(columns=LOCATION_COLUMNS)
+        part_positions = _part_positions(self.parts, table['Parts'].astype(object))
+        location_codes = pd.Index(self.locations).get_indexer(table['Location'].astype(object))
+        # Rows for parts no longer in the catalogue or for unconfigured locations fall back to the default location
+        kept = (part_positions >= 0) & (location_codes > 0)
+        self.cells = np.zeros(0, dtype=np.int64)
+        self.quantities = np.zeros(0, dtype=np.int64)
+        self._add(part_positions[kept] * len(self.locations) + location_codes[kept],
+                  pd.to_numeric(table['Stock']).to_numpy(dtype=np.int64)[kept])
+
+    # Function to merge quantity changes into the sparse cells, dropping cells that reach 0
+    def _add(self, cells, quantities):
+        cells, inverse = np.unique(np.concatenate([self.cells, cells]), return_inverse=True)
+        totals = np.zeros(len(cells), dtype=np.int64)
+        np.add.at(totals, inverse, np.concatenate([self.quantities, quantities]))
+        held = totals != 0
+        self.cells, self.quantities = cells[held], totals[held]
+
+    # Function to roll the sparse cells up into a parts x locations stock matrix, given each part's total stock
+    def stock_matrix(self, total):
+        n_parts, n_locations = len(self.parts), len(self.locations)
+        matrix = np.bincount(self.cells, weights=self.quantities, minlength=n_parts * n_locations)
+        matrix = matrix.astype(np.int64).reshape(n_parts, n_locations)
+        matrix[:, 0] = np.asarray(total, dtype=np.int64) - matrix[:, 1:].sum(axis=1)
+        return matrix
+
+    # Function to get every part's stock at one location, given each part's total stock
+    def location_stock(self, location, total):
+        code = self.locations.index(location)
+        n_locations = len(self.locations)
+        if code == 0:
+            held_elsewhere = np.bincount(self.cells // n_locations, weights=self.quantities, minlength=len(self.parts))
+            return np.asarray(total, dtype=np.int64) - held_elsewhere.astype(np.int64)
+        at_location = self.cells % n_locations == code
+        return np.bincount(self.cells[at_location] // n_locations, weights=self.quantities[at_location],
+                           minlength=len(self.parts)).astype(np.int64)
+
+    # Function to apply transfers [(part, from location, to location, quantity), ...] as paired movements;
+    # given each part's total stock, a source that does not hold the quantity raises ValueError
+    def transfer(self, transfers, total=None):
+        cells, quantities = [], []
+        for part, source, target, quantity in transfers:
+            for location in (source, target):
+                if location not in self.locations:
+                    raise ValueError(f"Unknown location: {location}")
+            if source == target:
+                raise ValueError("A transfer needs two different locations")
+            if int(quantity) <= 0:
+                raise ValueError("Transfer quantities must be positive")
+            position = _part_positions(self.parts, [part])[0]
+            if position < 0:
+                raise ValueError(f"Unknown part: {part}")
+            for location, delta in ((source, -int(quantity)), (target, int(quantity))):
+                code = self.locations.index(location)
+                # The default location is implicit: its stock is whatever the others do not hold
+                if code > 0:
+                    cells.append(position * len(self.locations) + code)
+                    quantities.append(delta)
+        previous = self.cells, self.quantities
+        before = self.stock_matrix(total) if total is not None else None
+        self._add(np.array(cells, dtype=np.int64), np.array(quantities, dtype=np.int64))
+        if before is not None:
+            # Checked on the result, so several transfers out of one location add up; a location already
+            # below zero may stay there but not go further
+            after = self.stock_matrix(total)
+            short = np.argwhere((after < 0) & (after < before))
+            if len(short):
+                self.cells, self.quantities = previous
+                position, code = short[0]
+                raise ValueError(f"{self.locations[code]} holds only {before[position, code]} "
+                                 f"of {self.parts[position]}")
+
+    # Function to list the stored cells as Parts, Location, Stock rows
+    def to_frame(self):
+        n_locations = len(self.locations)
+        return pd.DataFrame({
+            'Parts': self.parts[self.cells // n_locations],
+            'Location': np.asarray(self.locations, dtype=object)[self.cells % n_locations],
+            'Stock': self.quantities,
+        })
+
+
+# Per-location stock persisted as a CSV of the non-default cells, rewritten atomically under a file lock
+class LocationStore:
+    def __init__(self, path, locations):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.locations = list(locations)
+
+    def load(self, parts):
+        table = pd.read_csv(self.path) if os.path.exists(self.path) else None
+        return LocationStock(parts, self.locations, table)
+
+    # Function to identify the stored per-location stock cheaply; every transfer rewrites the file
+    def version(self):
+        return stat_key(self.path)
+
+    # Function to apply a batch of transfers in one atomic rewrite, checked against each part's total stock;
+    # record(transfers) runs under the lock first, so a transfer is only applied once it is on record.
+    # Returns the updated LocationStock
+    def transfer(self, parts, total, transfers, record=None):
+        with file_lock(self.lock_path, blocking=True):
+            location_stock = self.load(parts)
+            location_stock.transfer(transfers, total)
+            if record is not None:
+                record(transfers)
+            write_atomic(self.path, location_stock.to_frame().to_csv(index=False))
+        return location_stock
@@ -1,100 +1,38 @@
+import time
+
 import streamlit as st
 import pandas as pd
 from PIL import Image
 
-# Define the Excel file paths
-stock_file_path = 'Stock3.xlsx'
-parts_file_path = 'Stock3.xlsx'
-
-
-# Function to load parts requirements from the Excel file
-def load_parts_requirements():
-    df = pd.read_excel(parts_file_path)
-    model_parts_requirements = {}
-    for model in df.columns[3:6]:
-        model_parts_requirements[model] = df.set_index('Parts')[model].to_dict()
-    return model_parts_requirements
-
-
-# Function to load stock data from the Excel file
-def load_stock_data():
-    try:
-        df = pd.read_excel(stock_file_path)
-    except FileNotFoundError:
-        parts = {
-            "Motor": 10,
-            "Battery": 10,
-            "Controller": 10,
-            "Throttle": 10,
-            "Brake": 10,
-            "Frame": 10,
-            "Wheels": 10,
-            "Charger": 10,
-            "Seat": 10,
-            "Suspension": 10
-        }
-        df = pd.DataFrame(parts.items(), columns=['Parts', 'Stock'])
-        df.to_excel(stock_file_path, index=False)
-    return df
-
-
-# Function to save stock data to the Excel file
-def save_stock_data(df):
-    df.to_excel(stock_file_path, index=False)
-
-
-# Function to calculate how many models can be made with the current stock
-def calculate_producible(df, parts_requirements):
-    for model, requirements in parts_requirements.items():
-        # Use the existing column if it exists, otherwise create it
-        column_name = f"{model}s that can be made"
-        if column_name not in df.columns:
-            df[column_name] = 0
-
-        for index, row in df.iterrows():
-            part = row['Parts']
-            stock_qty = int(row['Stock'])  # Cast to int
-            if part in requirements:
-                qty = int(requirements[part])  # Cast to int
-                producible = stock_qty // qty if qty > 0 else 0
-                df.at[index, column_name] = producible
-    return df
-
-
-# Function to decrement stock for custom number of rickshaws, allowing negative values
-def decrement_stock(df, num_rickshaws, model, parts_requirements):
-    requirements = parts_requirements[model]
-    for part, qty in requirements.items():
-        df.loc[df['Parts'] == part, 'Stock'] -= qty * num_rickshaws
-    return df, True
-
-
-# Function to increment stock
-def increment_stock(df, selected_parts, quantity):
-    if "All stock" in selected_parts:
-        df['Stock'] = df['Stock'].apply(lambda x: int(x) + int(quantity))  # Cast to int
-    else:
-        for part in selected_parts:
-            df.loc[df['Parts'] == part, 'Stock'] = int(df.loc[df['Parts'] == part, 'Stock']) + int(quantity)
-    return df
-
-
-# Function to decrement custom stock, allowing negative values
-def decrement_custom_stock(df, selected_parts, quantity):
-    if "All stock" in selected_parts:
-        df['Stock'] = df['Stock'].apply(lambda x: int(x) - int(quantity))  # Cast to int
-    else:
-        for part in selected_parts:
-            df.loc[df['Parts'] == part, 'Stock'] = int(df.loc[df['Parts'] == part, 'Stock']) - int(quantity)
-    return df, True
-
-
-# Load parts requirements and stock data
-parts_requirements = load_parts_requirements()
-df = load_stock_data()
-
-# Calculate producible quantities
-df = calculate_producible(df, parts_requirements)
+import instrumentation
+from instrumentation import timed
+from planner import plan_production
+from stock_table import page_count, style_page, table_page
+from stock_core import (decrement_stock, record_production_batch, read_production_batch,
+                        increment_stock, decrement_custom_stock, location_state, buildable_by_location,
+                        transfer_stock, stock_locations, all_locations, consumption_forecast, write_queue,
+                        alert_engine)
+from stock_store import get_store
+from storage import StockConflict
+from write_behind import WriteBehindError
+from workbook_cache import cache_stats
+
+rerun_start = time.perf_counter()
+
+# Stock state shared by every session in this process; this rerun works on one consistent snapshot of it
+store = get_store()
+state = store.snapshot()
+parts_requirements = state.parts_requirements
+df = state.df
+# Shown when another writer kept the stored stock busy past every retry; the change was not made
+stock_busy_message = "Stock is busy being saved by someone else, so nothing was changed. Please try again."
+# Queued stock changes that fail to save are reported on every rerun until a write succeeds
+save_error = write_queue.last_error if write_queue is not None else None
+# Low-stock alerts that could not be written to the outbox; stock changes are saved regardless
+alert_error = alert_engine.last_error if alert_engine is not None else None
+# Columns of the stock tables; frames of them are read-only views of the stock state, not copies
+print_columns = ["Parts", "Stock", "Required per vehicle", "E-Rickshaws that can be made", "Round Model", "Loader",
+                 "Flexi Model"]
 
 # Streamlit app
 st.set_page_config(page_title="Electric Rickshaw Spare Parts Management", page_icon=":rickshaw:", layout="wide")
@@ -135,50 +73,66 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Function to apply stock filter
+# Function to apply stock filter by looking up the selected band in the band index
+@timed('filter', rows=len)
 def apply_stock_filter(df_print, stock_filter):
-    # Filter the dataframe based on stock range
-    if stock_filter == 'Below 0':
-        df_filtered = df_print[df_print['Stock'] < 0]
-    elif stock_filter == '0-100':
-        df_filtered = df_print[df_print['E-Rickshaws that can be made'] <= 100]
-    elif stock_filter == '101-200':
-        df_filtered = df_print[
-            (df_print['E-Rickshaws that can be made'] > 100) & (df_print['E-Rickshaws that can be made'] <= 200)]
-    elif stock_filter == '200+':
-        df_filtered = df_print[df_print['E-Rickshaws that can be made'] > 200]
-    else:
-        df_filtered = df_print
-    return df_filtered
-
-
-# Convert columns to integers
-df["Stock"] = df["Stock"].astype(int)
-df["E-Rickshaws that can be made"] = df["Stock"] // df["Required per vehicle"].astype(int)
-df_print = df[
-    ["Parts", "Stock", "Required per vehicle", "E-Rickshaws that can be made", "Round Model", "Loader", "Flexi Model"]]
-
-
-# Apply conditional formatting
-def highlight_rows(val):
-    if val <= 0:
-        return 'background-color: #8B0000; color: white'  # Dark red for 0 or negative stock
-    elif 1 <= val <= 100:
-        return 'background-color: #FF0000'  # Red for low stock
-    elif 101 <= val <= 200:
-        return 'background-color: #FFA500'  # Orange for medium stock
-    else:
-        return 'background-color: #90EE90'  # Green for high stock
+    if band_column not in df_print.columns:
+        df_print = view.frame(list(df_print.columns) + [band_column])
+    return view.bands[band_column].select(df_print, stock_filter)
+
+
+# Function to show a table one page at a time, sorting and colouring only the visible rows
+@timed('render')
+def render_stock_table(df_table, key):
+    controls = st.columns(4)
+    sort_by = controls[0].selectbox('Sort by', ['(none)'] + list(df_table.columns), key=f'{key}_sort')
+    ascending = controls[1].radio('Order', ('Ascending', 'Descending'), key=f'{key}_order') == 'Ascending'
+    page_size = controls[2].selectbox('Rows per page', (50, 100, 500, 1000), index=1, key=f'{key}_page_size')
+    pages = page_count(len(df_table), page_size)
+    page = controls[3].number_input(f'Page (of {pages})', min_value=1, max_value=pages, value=1, step=1,
+                                    key=f'{key}_page')
+    page_df = table_page(df_table, page, page_size, None if sort_by == '(none)' else sort_by, ascending)
+    st.dataframe(style_page(page_df, view.bands[band_column], band_column))
+    st.caption(f"Showing {len(page_df)} of {len(df_table)} parts")
 
 
 # Header section
 st.image("https://www.bybyerickshaw.com/images/logo.png", width=200)
 st.title("Electric Rickshaw Spare Parts Management")
-
-# Stock filter
+if save_error is not None:
+    st.error(f"Stock changes are not being saved: {save_error}. They are kept and retried; "
+             "new changes are refused until saving works again.")
+if alert_error is not None:
+    st.warning(f"Low-stock alerts are not being recorded: {alert_error}. Stock changes are still saved; "
+               "alerts are retried on the next change to the affected parts.")
+
+# Location to show stock for; with a single location there is nothing to choose
+if len(stock_locations) > 1:
+    location = st.selectbox("Location", [all_locations] + stock_locations)
+else:
+    location = all_locations
+view = location_state(state, location)
+df_print = view.frame(print_columns)
+
+# Complete vehicles the current stock supports, per model
+buildable = view.buildable()
+for column, (model_name, count) in zip(st.columns(len(buildable)), buildable.items()):
+    column.metric(f"{model_name}s buildable", count)
+if len(stock_locations) > 1:
+    with st.expander("Buildable per location"):
+        st.dataframe(pd.DataFrame(buildable_by_location(state)).T)
+    if location != all_locations:
+        st.caption(f"Production, receipts and removals are booked at {stock_locations[0]}; "
+                   "use Transfer Stock to move parts between locations.")
+
+# Stock filter; the band edges of each quantity are configured in stock_table.BAND_EDGES
+band_columns = list(view.bands)
+band_column = st.selectbox("Band parts by", band_columns,
+                           index=band_columns.index("E-Rickshaws that can be made")
+                           if "E-Rickshaws that can be made" in band_columns else 0)
 stock_filter = st.radio(
     "Filter Parts by Stock Range",
-    ('All', 'Below 0', '0-100', '101-200', '200+')
+    ('All',) + view.bands[band_column].labels
 )
 
 # Apply the filter initially
@@ -186,23 +140,107 @@ df_filtered = apply_stock_filter(df_print, stock_filter)
 
 # Display current stock with color formatting
 st.subheader("Current Stock of Parts")
-st.dataframe(df_filtered.style.applymap(highlight_rows, subset=["E-Rickshaws that can be made"]))
+render_stock_table(df_filtered, 'stock_table')
 
 # Section to decrement stock for custom number of rickshaws
 st.subheader("Record New Rickshaws")
 model = st.selectbox('Select Rickshaw Model', parts_requirements.keys(), key='model')
 num_rickshaws = st.number_input('Number of Rickshaws to Record', min_value=1, step=1, key='num_rickshaws')
+# Explain any shortage live as the count changes; this only reads the in-memory stock
+shortage_report, max_buildable = state.shortages(model, num_rickshaws)
+short_parts = shortage_report[shortage_report['Shortfall'] > 0]
+if len(short_parts):
+    st.warning(f"Only {max_buildable} {model}(s) can be built now; {len(short_parts)} part(s) are short "
+               f"for {num_rickshaws}. Recording anyway lets their stock go negative.")
+    st.dataframe(short_parts.head(20))
+else:
+    st.caption(f"Stock covers {num_rickshaws} {model}(s); up to {max_buildable} can be built now.")
 if st.button('Record Rickshaws Made'):
-    df, success = decrement_stock(df, num_rickshaws, model, parts_requirements)
+    try:
+        df, success = store.mutate(decrement_stock, num_rickshaws, model)
+    except (WriteBehindError, OSError) as error:
+        st.error(str(error))
+        success = False
+    except StockConflict:
+        st.error(stock_busy_message)
+        success = False
     if success:
-        save_stock_data(df)
-        df = calculate_producible(df, parts_requirements)
-        df_print = df[
-            ["Parts", "Stock", "Required per vehicle", "E-Rickshaws that can be made", "Round Model", "Loader",
-             "Flexi Model"]]
+        state = store.snapshot()
+        view = location_state(state, location)
+        df_print = view.frame(print_columns)
         df_filtered = apply_stock_filter(df_print, stock_filter)  # Reapply filter to updated data
         st.success(f"Stock updated successfully for {num_rickshaws} rickshaw(s) of {model}!")
-        st.dataframe(df_filtered.style.applymap(highlight_rows, subset=["E-Rickshaws that can be made"]))
+        render_stock_table(df_filtered, 'recorded_table')
+
+# Section to record a whole shift's production across models in one write
+st.subheader("Record a Production Batch")
+with st.form('production_batch'):
+    batch_columns = st.columns(len(parts_requirements))
+    batch_counts = {
+        model_name: column.number_input(model_name, min_value=0, step=1, key=f'batch_{model_name}')
+        for column, model_name in zip(batch_columns, parts_requirements)
+    }
+    batch_file = st.file_uploader('Or upload a CSV of builds (Model, Count)', type='csv')
+    batch_submitted = st.form_submit_button('Record Production Batch')
+if batch_submitted:
+    try:
+        if batch_file is not None:
+            for model_name, count in read_production_batch(batch_file).items():
+                batch_counts[model_name] = batch_counts.get(model_name, 0) + count
+        df, success = store.mutate(record_production_batch, batch_counts)
+    except (ValueError, WriteBehindError, OSError) as error:
+        st.error(str(error))
+        success = False
+    except StockConflict:
+        st.error(stock_busy_message)
+        success = False
+    if success:
+        state = store.snapshot()
+        view = location_state(state, location)
+        df_print = view.frame(print_columns)
+        df_filtered = apply_stock_filter(df_print, stock_filter)  # Reapply filter to updated data
+        recorded = ", ".join(f"{count} {model_name}" for model_name, count in batch_counts.items() if count)
+        st.success(f"Stock updated successfully for {recorded or 'no rickshaws'}!")
+        render_stock_table(df_filtered, 'batch_table')
+
+# Section to plan the mix of models the shared stock supports best
+st.subheader("Plan Production Mix")
+with st.expander("Margins and minimum quotas"):
+    plan_weights, plan_quotas = {}, {}
+    for column, model_name in zip(st.columns(len(parts_requirements)), parts_requirements):
+        plan_weights[model_name] = column.number_input(f'{model_name} margin', min_value=0.0, value=1.0,
+                                                       key=f'weight_{model_name}')
+        plan_quotas[model_name] = column.number_input(f'{model_name} minimum', min_value=0, step=1,
+                                                      key=f'quota_{model_name}')
+if st.button('Plan Production'):
+    try:
+        plan = plan_production(view.df['Parts'], view.df['Stock'], parts_requirements, plan_weights, plan_quotas)
+    except ValueError as error:
+        st.error(str(error))
+    else:
+        st.success("Best mix: " + ", ".join(f"{count} {model_name}" for model_name, count in plan['plan'].items()))
+        st.dataframe(pd.DataFrame({
+            'Model': list(plan['plan']),
+            'Planned': list(plan['plan'].values()),
+            'Binding parts': [", ".join(plan['binding'][model_name][:10]) for model_name in plan['plan']],
+        }))
+
+# Section to forecast stock-outs from the consumption recorded so far
+st.subheader("Stock-out Forecast")
+forecast_columns = st.columns(3)
+lead_time_days = forecast_columns[0].number_input('Supplier lead time (days)', min_value=1, value=14, step=1,
+                                                  key='lead_time_days')
+halflife_days = forecast_columns[1].number_input('Usage half-life (days)', min_value=1, value=14, step=1,
+                                                 key='halflife_days')
+review_days = forecast_columns[2].number_input('Order cover (days)', min_value=1, value=30, step=1,
+                                               key='review_days')
+forecast = consumption_forecast(state, lead_time_days, halflife_days, review_days)
+if forecast is None:
+    st.caption("Forecasting needs the movement history kept by the journal storage backend.")
+else:
+    to_order = forecast[forecast['Suggested order'] > 0].sort_values('Days left')
+    st.caption(f"{len(to_order)} part(s) at or below their reorder point")
+    st.dataframe(to_order.head(100))
 
 # Section to increment stock
 st.subheader("Increment Stock of Parts")
@@ -210,27 +248,96 @@ parts_list = ["All stock"] + df['Parts'].tolist()
 increment_parts = st.multiselect('Select Parts to Increment', parts_list)
 quantity_increment = st.number_input('Quantity to Add', min_value=1, step=1, key='increment_qty')
 if st.button('Increment Stock'):
-    df = increment_stock(df, increment_parts, quantity_increment)
-    save_stock_data(df)
-    df = calculate_producible(df, parts_requirements)
-    df_print = df[["Parts", "Stock", "Required per vehicle", "E-Rickshaws that can be made", "Round Model", "Loader",
-                   "Flexi Model"]]
-    df_filtered = apply_stock_filter(df_print, stock_filter)  # Reapply filter to updated data
-    st.success("Stock incremented successfully!")
-    st.dataframe(df_filtered.style.applymap(highlight_rows, subset=["E-Rickshaws that can be made"]))
+    try:
+        df = store.mutate(increment_stock, increment_parts, quantity_increment)
+    except (WriteBehindError, OSError) as error:
+        st.error(str(error))
+    except StockConflict:
+        st.error(stock_busy_message)
+    else:
+        state = store.snapshot()
+        view = location_state(state, location)
+        df_print = view.frame(print_columns)
+        df_filtered = apply_stock_filter(df_print, stock_filter)  # Reapply filter to updated data
+        st.success("Stock incremented successfully!")
+        render_stock_table(df_filtered, 'incremented_table')
 
 # Section to decrement custom stock
 st.subheader("Decrement Stock of Parts")
 decrement_parts = st.multiselect('Select Parts to Decrement', parts_list)
 quantity_decrement = st.number_input('Quantity to Subtract', min_value=1, step=1, key='decrement_qty')
 if st.button('Decrement Stock'):
-    df, success = decrement_custom_stock(df, decrement_parts, quantity_decrement)
+    try:
+        df, success = store.mutate(decrement_custom_stock, decrement_parts, quantity_decrement)
+    except (WriteBehindError, OSError) as error:
+        st.error(str(error))
+        success = False
+    except StockConflict:
+        st.error(stock_busy_message)
+        success = False
     if success:
-        save_stock_data(df)
-        df = calculate_producible(df, parts_requirements)
-        df_print = df[
-            ["Parts", "Stock", "Required per vehicle", "E-Rickshaws that can be made", "Round Model", "Loader",
-             "Flexi Model"]]
+        state = store.snapshot()
+        view = location_state(state, location)
+        df_print = view.frame(print_columns)
         df_filtered = apply_stock_filter(df_print, stock_filter)  # Reapply filter to updated data
         st.success("Stock decremented successfully!")
-        st.dataframe(df_filtered.style.applymap(highlight_rows, subset=["E-Rickshaws that can be made"]))
+        render_stock_table(df_filtered, 'decremented_table')
+
+# Section to move stock between locations
+if len(stock_locations) > 1:
+    st.subheader("Transfer Stock")
+    transfer_parts = st.multiselect('Select Parts to Transfer', df['Parts'].tolist())
+    transfer_columns = st.columns(3)
+    transfer_from = transfer_columns[0].selectbox('From', stock_locations, key='transfer_from')
+    transfer_to = transfer_columns[1].selectbox('To', stock_locations, index=1, key='transfer_to')
+    quantity_transfer = transfer_columns[2].number_input('Quantity to Move', min_value=1, step=1,
+                                                         key='transfer_qty')
+    if st.button('Transfer Stock'):
+        try:
+            store.mutate(transfer_stock,
+                         [(part, transfer_from, transfer_to, quantity_transfer) for part in transfer_parts])
+        except (ValueError, WriteBehindError, OSError) as error:
+            st.error(str(error))
+        except StockConflict:
+            st.error(stock_busy_message)
+        else:
+            state = store.snapshot()
+            view = location_state(state, location)
+            df_print = view.frame(print_columns)
+            df_filtered = apply_stock_filter(df_print, stock_filter)  # Reapply filter to updated data
+            st.success(f"Moved {quantity_transfer} of each of {len(transfer_parts)} part(s) "
+                       f"from {transfer_from} to {transfer_to}!")
+            render_stock_table(df_filtered, 'transferred_table')
+
+# Rerun when another session or process changes the stock, or saving or alerting starts or stops failing, so
+# every operator sees it without reloading the page
+st.session_state['stock_version'] = store.version
+st.session_state['save_failing'] = (save_error is not None, alert_error is not None)
+
+
+@st.fragment(run_every=2)
+def watch_stock_changes():
+    store.refresh()
+    failing = (write_queue is not None and write_queue.last_error is not None,
+               alert_engine is not None and alert_engine.last_error is not None)
+    if store.version != st.session_state['stock_version'] or failing != st.session_state['save_failing']:
+        st.rerun()
+
+
+watch_stock_changes()
+
+# Workbook cache counters, to confirm reruns are not re-parsing the file
+stats = cache_stats()
+st.caption(f"Workbook cache: {stats['hits']} hits, {stats['misses']} misses ({stats['sidecar']} from sidecar)")
+
+# Timings of every stock operation in this process, for spotting regressions
+instrumentation.record('rerun', time.perf_counter() - rerun_start)
+if instrumentation.enabled():
+    with st.expander("Diagnostics"):
+        timings = pd.DataFrame(instrumentation.snapshot()).T.drop(columns='buckets', errors='ignore')
+        st.dataframe(timings)
+        dump_columns = st.columns(2)
+        dump_columns[0].download_button('Download JSON', instrumentation.to_json(), 'stock_timings.json',
+                                        'application/json')
+        dump_columns[1].download_button('Download Prometheus text', instrumentation.to_prometheus(),
+                                        'stock_timings.prom', 'text/plain')
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+
+# Function to build the part name -> row position index of a stock frame (a hash lookup per part)
+def build_part_index(df):
+    return pd.Index(df['Parts'])
+
+
+# Function to find the row positions of the given parts; returns (positions, mask of parts found)
+def locate_parts(part_index, parts):
+    positions = part_index.get_indexer(list(parts))
+    found = positions >= 0
+    return positions[found], found
+
+
+# Function to add deltas to the Stock of a batch of parts; returns the new quantity of each touched part
+def add_stock(df, part_index, deltas):
+    if not part_index.is_unique:
+        touched = df['Parts'].isin(list(deltas))
+        df.loc[touched, 'Stock'] = df.loc[touched, 'Stock'] + df.loc[touched, 'Parts'].astype(object).map(deltas)
+        return dict(zip(df.loc[touched, 'Parts'], df.loc[touched, 'Stock'].astype(int).tolist()))
+    positions, found = locate_parts(part_index, deltas.keys())
+    stock_column = df.columns.get_loc('Stock')
+    values = df.iloc[positions, stock_column].to_numpy(dtype=np.int64)
+    # Not in place: pandas 3 hands out a read-only view of the column
+    values = values + np.fromiter(deltas.values(), dtype=np.int64, count=len(deltas))[found]
+    df.iloc[positions, stock_column] = values.astype(df['Stock'].dtype, copy=False)
+    return dict(zip(part_index[positions], values.tolist()))
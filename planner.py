@@ -0,0 +1,114 @@
+import numpy as np
+
+from producibility import build_requirement_matrix
+
+try:
+    from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+except ImportError:  # scipy is optional; without it only the greedy planner is available
+    milp = None
+
+
+# Function to shrink the parts x models constraints: drop unused parts and keep the tightest stock per requirement row
+def presolve(matrix, stock):
+    used = matrix.any(axis=1)
+    rows, inverse = np.unique(matrix[used], axis=0, return_inverse=True)
+    tight = np.full(len(rows), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(tight, inverse.ravel(), stock[used])
+    return rows, tight
+
+
+# Function to compute how many more units of each model the remaining stock allows on its own
+def model_capacity(rows, remaining):
+    required = rows > 0
+    per_part = np.where(required, remaining[:, None] // np.where(required, rows, 1), np.iinfo(np.int64).max)
+    return per_part.min(axis=0) if len(rows) else np.zeros(rows.shape[1], dtype=np.int64)
+
+
+# Function to fill a plan greedily: repeatedly add the best weight-per-scarce-stock model in halving steps
+def greedy_fill(rows, tight, weights, start):
+    plan = start.copy()
+    remaining = tight - rows @ plan
+    active = weights > 0
+    while True:
+        capacity = model_capacity(rows, remaining)
+        candidates = active & (capacity > 0)
+        if not candidates.any():
+            return plan
+        scarcity = (rows / np.maximum(remaining, 1)[:, None]).sum(axis=0)
+        score = np.where(candidates, weights / np.maximum(scarcity, 1e-12), -np.inf)
+        best = int(np.argmax(score))
+        step = max(1, int(capacity[best]) // 2)
+        plan[best] += step
+        remaining -= rows[:, best] * step
+
+
+# Function to solve the integer program exactly with scipy's MILP solver; None if it finds no solution
+def solve_ilp(rows, tight, weights, quotas, upper, time_limit):
+    result = milp(c=-weights, constraints=LinearConstraint(rows, -np.inf, tight),
+                  integrality=np.ones(len(weights)), bounds=Bounds(quotas, upper),
+                  options={'time_limit': time_limit})
+    if result.x is None:
+        return None
+    return np.round(result.x).astype(np.int64)
+
+
+# Function to solve the LP relaxation, round down and top up greedily
+def solve_lp(rows, tight, weights, quotas, upper):
+    result = linprog(-weights, A_ub=rows, b_ub=tight, bounds=list(zip(quotas, upper)), method='highs')
+    if result.x is None:
+        return None
+    start = np.maximum(np.floor(result.x + 1e-9).astype(np.int64), quotas)
+    return greedy_fill(rows, tight, weights, start)
+
+
+# Function to plan how many of each model to build from current stock, maximizing total weight (e.g. margin)
+def plan_production(parts, stock, parts_requirements, weights=None, quotas=None, method='auto', time_limit=10):
+    models, matrix = build_requirement_matrix(parts, parts_requirements)
+    matrix = np.clip(matrix, 0, None)
+    stock = np.clip(np.asarray(stock, dtype=np.int64), 0, None)
+    weight_vector = np.array([(weights or {}).get(model, 1) for model in models], dtype=float)
+    quota_vector = np.array([(quotas or {}).get(model, 0) for model in models], dtype=np.int64)
+    if (weight_vector < 0).any() or (quota_vector < 0).any():
+        raise ValueError("Weights and quotas cannot be negative")
+    if (matrix @ quota_vector > stock).any():
+        raise ValueError("Current stock cannot meet the minimum quotas")
+
+    # A model with no required parts would be unbounded; it is left out of the plan
+    plannable = matrix.any(axis=0)
+    if not plannable.any():
+        # Nothing to solve; the greedy fill would stop at once too
+        return {
+            'plan': dict.fromkeys(models, 0),
+            'objective': 0.0,
+            'method': 'greedy',
+            'binding': {model: [] for model in models},
+        }
+    rows, tight = presolve(matrix[:, plannable], stock)
+    weight_vector, quota_vector = weight_vector[plannable], quota_vector[plannable]
+    upper = model_capacity(rows, tight).astype(float)
+
+    if method == 'auto':
+        method = 'ilp' if milp is not None else 'greedy'
+    if method in ('ilp', 'lp') and milp is None:
+        raise ValueError("The ilp and lp planners need scipy installed")
+    plan = None
+    if method == 'ilp':
+        plan = solve_ilp(rows, tight, weight_vector, quota_vector, upper, time_limit)
+    elif method == 'lp':
+        plan = solve_lp(rows, tight, weight_vector, quota_vector, upper)
+    if plan is None:
+        method = 'greedy'
+        plan = greedy_fill(rows, tight, weight_vector, quota_vector)
+
+    counts = np.zeros(len(models), dtype=np.int64)
+    counts[plannable] = plan
+    remaining = stock - matrix @ counts
+    # A part is binding for a model when what is left of it cannot cover one more unit
+    blocking = (matrix > 0) & (remaining[:, None] < matrix)
+    parts = np.asarray(parts)
+    return {
+        'plan': dict(zip(models, counts.tolist())),
+        'objective': float(weight_vector @ plan),
+        'method': method,
+        'binding': {model: parts[blocking[:, j]].tolist() for j, model in enumerate(models)},
+    }
@@ -0,0 +1,143 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+# Function to build the parts x models requirement matrix aligned to the Parts column
+def build_requirement_matrix(parts, parts_requirements):
+    models = list(parts_requirements.keys())
+    parts_index = pd.Index(parts)
+    matrix = np.zeros((len(parts_index), len(models)), dtype=np.int32)
+    for j, model in enumerate(models):
+        # Missing or non-numeric requirements count as 0, same as the old qty > 0 check
+        column = pd.Series(parts_requirements[model], dtype=object).reindex(parts_index)
+        matrix[:, j] = pd.to_numeric(column, errors='coerce').fillna(0).astype(np.int32).to_numpy()
+    return models, matrix
+
+
+# Function to compute how many of each model every part's stock can cover (0 where not required);
+# int32 stock gives an int32 result
+def producible_matrix(stock, matrix):
+    stock = np.asarray(stock)
+    stock = (stock if stock.dtype == np.int32 else stock.astype(np.int64))[:, None]
+    required = matrix > 0
+    return np.where(required, stock // np.where(required, matrix, 1), 0).astype(stock.dtype, copy=False)
+
+
+# Function to compute the overall buildable count per model (min over its required parts); a part with negative
+# stock means none can be built, not a negative number
+def buildable_counts(producible, matrix):
+    required = matrix > 0
+    if producible.shape[0] == 0:
+        return np.zeros(matrix.shape[1], dtype=np.int64)
+    limited = np.where(required, producible, np.iinfo(producible.dtype).max).min(axis=0)
+    return np.where(required.any(axis=0), np.maximum(limited, 0), 0)
+
+
+# Function to calculate every "<model>s that can be made" column in one batched pass
+def calculate_producible(df, parts_requirements):
+    models, matrix = build_requirement_matrix(df['Parts'], parts_requirements)
+    producible = producible_matrix(df['Stock'].to_numpy(), matrix)
+    for j, model in enumerate(models):
+        df[f"{model}s that can be made"] = producible[:, j]
+    return df
+
+
+# Function to calculate how many complete vehicles of each model the current stock supports
+def calculate_buildable(df, parts_requirements):
+    models, matrix = build_requirement_matrix(df['Parts'], parts_requirements)
+    producible = producible_matrix(df['Stock'].to_numpy(), matrix)
+    return dict(zip(models, buildable_counts(producible, matrix).tolist()))
+
+
+# Function to compute the combined part demand of a production batch (model -> count) in one matrix product
+# over a parts x models requirement matrix, e.g. the one a ProducibilityIndex already holds
+def batch_demand(models, matrix, counts):
+    unknown = set(counts) - set(models)
+    if unknown:
+        raise ValueError(f"Unknown model(s): {', '.join(sorted(map(str, unknown)))}")
+    count_vector = np.array([counts.get(model, 0) for model in models], dtype=np.int64)
+    if (count_vector < 0).any():
+        raise ValueError("Rickshaw counts cannot be negative")
+    return np.clip(matrix, 0, None) @ count_vector
+
+
+# Producible counts kept up to date part by part, with a per-model segment tree of minima for the buildable counts
+class ProducibilityIndex:
+    def __init__(self, parts, stock, parts_requirements):
+        self.models, self.matrix = build_requirement_matrix(parts, parts_requirements)
+        self.required = self.matrix > 0
+        self.has_requirements = self.required.any(axis=0)
+        self.producible = producible_matrix(stock, self.matrix)
+        self.size = 1
+        while self.size < len(self.matrix):
+            self.size *= 2
+        # Leaves hold each part's producible count; parts a model does not need never limit it
+        self.tree = np.full((2 * self.size, len(self.models)), np.iinfo(self.producible.dtype).max,
+                            dtype=self.producible.dtype)
+        self.tree[self.size:self.size + len(self.matrix)] = self._leaves(slice(None))
+        level = self.size // 2
+        while level >= 1:
+            nodes = np.arange(level, 2 * level)
+            self.tree[nodes] = np.minimum(self.tree[2 * nodes], self.tree[2 * nodes + 1])
+            level //= 2
+
+    def _leaves(self, positions):
+        return np.where(self.required[positions], self.producible[positions], np.iinfo(self.producible.dtype).max)
+
+    # Function to recompute only the given rows from the full stock array; O(k log n) for k touched parts
+    def update(self, positions, stock):
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        if len(positions) == 0:
+            return
+        self.producible[positions] = producible_matrix(np.asarray(stock)[positions], self.matrix[positions])
+        nodes = positions + self.size
+        self.tree[nodes] = self._leaves(positions)
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = np.minimum(self.tree[2 * nodes], self.tree[2 * nodes + 1])
+
+    # Function to copy the index; the requirement arrays never change and are shared
+    def copy(self):
+        clone = copy.copy(self)
+        clone.producible = self.producible.copy()
+        clone.tree = self.tree.copy()
+        return clone
+
+    # Function to read the buildable count per model off the tree roots
+    def buildable(self):
+        # A required part with negative stock means none can be built
+        counts = np.where(self.has_requirements, np.maximum(self.tree[1], 0), 0)
+        return dict(zip(self.models, counts.tolist()))
+
+    # Function to write the "<model>s that can be made" columns of a StockTable, for all rows or just the given positions
+    def write_columns(self, table, positions=None):
+        for j, model in enumerate(self.models):
+            column = f"{model}s that can be made"
+            if positions is None:
+                table.set_column(column, self.producible[:, j])
+            else:
+                table.arrays[column][positions] = self.producible[positions, j]
+        return table
+
+    # Function to explain what limits building count of one model: per required part the demand, shortfall
+    # and how many the part covers, most limiting first; also returns the count buildable now
+    def shortages(self, model, count, parts, stock):
+        if model not in self.models:
+            raise ValueError(f"Unknown model: {model}")
+        j = self.models.index(model)
+        required = np.flatnonzero(self.required[:, j])
+        stock = np.asarray(stock, dtype=np.int64)[required]
+        demand = self.matrix[required, j].astype(np.int64) * int(count)
+        covers = self.producible[required, j]
+        report = pd.DataFrame({
+            'Parts': np.asarray(parts)[required],
+            'Per vehicle': self.matrix[required, j],
+            'Needed': demand,
+            'Stock': stock,
+            'Shortfall': np.maximum(demand - stock, 0),
+            'Covers': covers,
+        })
+        order = np.lexsort((-report['Shortfall'].to_numpy(), covers))
+        return report.iloc[order].reset_index(drop=True), self.buildable()[model]
@@ -0,0 +1,131 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from producibility import build_requirement_matrix, buildable_counts, producible_matrix
+
+# Shared arrays a worker process has mapped, by role: role -> (block, array)
+_attached = {}
+
+
+# Function to count the cores this process may run on
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Function to copy an array into a new shared memory block; returns (block, array view of it)
+def share_array(values):
+    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    shared = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+    shared[...] = values
+    return block, shared
+
+
+# Function to map a shared memory block into this worker process, once per block; a new block for a role
+# replaces the one mapped before
+def _attach(role, name, shape, dtype):
+    entry = _attached.get(role)
+    if entry is None or entry[0].name != name:
+        if entry is not None:
+            del _attached[role]
+            entry[0].close()
+        # Spawned workers share the creating process's resource tracker, which keeps the block until it is unlinked
+        block = shared_memory.SharedMemory(name=name)
+        _attached[role] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+    return _attached[role][1]
+
+
+# Function to evaluate a slice of scenarios in a worker: buildable count per model for stock plus each delta vector
+def _evaluate_chunk(stock_spec, matrix_spec, deltas_spec, start, stop):
+    stock = _attach('stock', *stock_spec)
+    matrix = _attach('matrix', *matrix_spec)
+    deltas = _attach('deltas', *deltas_spec)
+    counts = np.empty((stop - start, matrix.shape[1]), dtype=np.int64)
+    for i in range(start, stop):
+        counts[i - start] = buildable_counts(producible_matrix(stock + deltas[i], matrix), matrix)
+    return start, counts
+
+
+# Function to turn scenarios into a scenarios x parts delta array: either such an array already,
+# or a list of {part: quantity} dicts; raises ValueError on unknown parts
+def delta_matrix(parts, scenarios):
+    if isinstance(scenarios, np.ndarray):
+        if scenarios.ndim != 2 or scenarios.shape[1] != len(parts):
+            raise ValueError(f"Scenario deltas must have one column per part ({len(parts)})")
+        return np.ascontiguousarray(scenarios, dtype=np.int32)
+    parts_index = pd.Index(parts)
+    deltas = np.zeros((len(scenarios), len(parts_index)), dtype=np.int32)
+    for i, scenario in enumerate(scenarios):
+        positions = parts_index.get_indexer(list(scenario))
+        if (positions < 0).any():
+            unknown = [part for part, position in zip(scenario, positions) if position < 0]
+            raise ValueError(f"Unknown part(s) in scenario {i}: {', '.join(map(str, unknown[:10]))}")
+        deltas[i, positions] = list(scenario.values())
+    return deltas
+
+
+# Evaluates batches of "what if this stock arrives" scenarios on a process pool; the stock and requirement matrix
+# live in shared memory that every worker maps once, so tasks carry only block names and scenario ranges
+class ScenarioEvaluator:
+    def __init__(self, parts, stock, parts_requirements, workers=None):
+        self.parts = pd.Index(parts)
+        self.models, matrix = build_requirement_matrix(self.parts, parts_requirements)
+        self.workers = workers or available_cores()
+        self._blocks = []
+        self._stock_spec = self._share(np.asarray(stock, dtype=np.int64))
+        self._matrix_spec = self._share(matrix)
+        # Spawned workers are safe next to the app's threads, unlike forked ones
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _share(self, values):
+        block, shared = share_array(values)
+        self._blocks.append(block)
+        return block.name, shared.shape, shared.dtype.str
+
+    # Function to compute buildable counts per model for every scenario; returns a scenarios x models frame
+    def evaluate(self, scenarios, chunk_size=None):
+        deltas = delta_matrix(self.parts, scenarios)
+        block, shared = share_array(deltas)
+        try:
+            deltas_spec = (block.name, shared.shape, shared.dtype.str)
+            # A few chunks per worker keeps every core busy while scenario costs vary
+            chunk_size = chunk_size or max(1, math.ceil(len(deltas) / (4 * self.workers)))
+            counts = np.zeros((len(deltas), len(self.models)), dtype=np.int64)
+            futures = [self._pool.submit(_evaluate_chunk, self._stock_spec, self._matrix_spec, deltas_spec,
+                                         start, min(start + chunk_size, len(deltas)))
+                       for start in range(0, len(deltas), chunk_size)]
+            for future in futures:
+                start, chunk = future.result()
+                counts[start:start + len(chunk)] = chunk
+        finally:
+            del shared
+            block.close()
+            block.unlink()
+        return pd.DataFrame(counts, columns=self.models)
+
+    # Function to stop the workers and free the shared memory
+    def close(self):
+        self._pool.shutdown()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Function to evaluate one batch of scenarios with a pool used just for it
+def evaluate_scenarios(parts, stock, parts_requirements, scenarios, workers=None):
+    with ScenarioEvaluator(parts, stock, parts_requirements, workers) as evaluator:
+        return evaluator.evaluate(scenarios)
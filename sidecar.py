@@ -0,0 +1,48 @@
+import os
+import uuid
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; without it every load parses the workbook
+    pa = None
+
+
+# Function to name the columnar sidecar kept next to a workbook
+def sidecar_path(path):
+    return path + '.arrow'
+
+
+# Function to read the sidecar memory-mapped, if it was written from exactly this version of the workbook
+def read_sidecar(path, source_key):
+    if pa is None or not os.path.exists(sidecar_path(path)):
+        return None
+    try:
+        with pa.memory_map(sidecar_path(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+        if metadata.get(b'source_key') != repr(source_key).encode():
+            # The workbook was edited (e.g. by hand) after the sidecar was written
+            return None
+        return table.to_pandas()
+    except (pa.ArrowException, OSError):
+        return None
+
+
+# Function to write the sidecar for a workbook version, via temp file and rename; returns False if the frame won't convert
+def write_sidecar(path, df, source_key):
+    if pa is None:
+        return False
+    tmp_path = f"{sidecar_path(path)}.{uuid.uuid4().hex}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               b'source_key': repr(source_key).encode()})
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, sidecar_path(path))
+        return True
+    except (pa.ArrowException, TypeError, ValueError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
@@ -0,0 +1,117 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+
+# Function to get a read-only view of an array, so frames built on it cannot change the table behind its back
+def read_only(values):
+    view = values.view()
+    view.flags.writeable = False
+    return view
+
+
+# Function to hold a column compactly: whole numbers as contiguous int32 when they fit, anything else unchanged;
+# numbers are always copied into arrays the table owns, as pandas may hand out read-only views of its own
+def compact_column(column):
+    if is_numeric_dtype(column.dtype) and not is_bool_dtype(column.dtype):
+        values = column.to_numpy()
+        whole = np.isfinite(values).all() and (values % 1 == 0).all() if values.dtype.kind == 'f' else True
+        if whole and (len(values) == 0 or np.abs(values).max() < 2 ** 31):
+            return np.array(values, dtype=np.int32, order='C', copy=True)
+        return np.array(values, order='C', copy=True)
+    return column.array
+
+
+# Function to check new stock quantities fit the int32 stock column before any are written, as construction does
+def check_stock_range(values):
+    info = np.iinfo(np.int32)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError("Stock must be whole numbers within the int32 range")
+    return values
+
+
+# Stock catalogue held as typed columns: int32 part codes into a table of unique names, int32 stock and
+# requirements, and the computed columns; frames over it are zero-copy read-only views
+class StockTable:
+    def __init__(self, df):
+        codes, uniques = pd.factorize(df['Parts'])
+        # Each name stored once, in order of first appearance, so with unique parts a row's code is its position.
+        # Held as Python objects: the hash lookup over them materializes objects anyway, even for Arrow strings
+        self.names = pd.Index(np.asarray(uniques, dtype=object), dtype=object)
+        self.codes = codes.astype(np.int32)
+        self.unique = len(self.names) == len(self.codes)
+        self.parts_dtype = pd.CategoricalDtype(self.names)
+        self.columns = list(df.columns)
+        self.arrays = {column: compact_column(df[column]) for column in self.columns if column != 'Parts'}
+        if 'Stock' in self.arrays and self.arrays['Stock'].dtype != np.int32:
+            raise ValueError("Stock must be whole numbers within the int32 range")
+        self._frame = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def stock(self):
+        return self.arrays['Stock']
+
+    # Function to copy the table; the part name table never changes and is shared
+    def copy(self):
+        clone = copy.copy(self)
+        clone.arrays = {column: values.copy() for column, values in self.arrays.items()}
+        clone.columns = list(self.columns)
+        clone._frame = None
+        return clone
+
+    # Function to add or replace a column, stored compactly
+    def set_column(self, column, values):
+        self.arrays[column] = compact_column(pd.Series(values))
+        if column not in self.columns:
+            self.columns.append(column)
+        self._frame = None
+
+    # Function to get the part names as a categorical over the name table, sharing the codes
+    def parts(self):
+        return pd.Categorical.from_codes(read_only(self.codes), dtype=self.parts_dtype)
+
+    # Function to view columns as a DataFrame without copying them; the table's in-place changes show through
+    def frame(self, columns=None):
+        if columns is None:
+            if self._frame is None:
+                self._frame = self._build_frame(self.columns)
+            return self._frame
+        return self._build_frame(columns)
+
+    def _build_frame(self, columns):
+        data = {column: self.parts() if column == 'Parts' else self._view(column) for column in columns}
+        return pd.DataFrame(data, copy=False)
+
+    def _view(self, column):
+        values = self.arrays[column]
+        return read_only(values) if isinstance(values, np.ndarray) else values
+
+    # Function to find the rows of the given parts; returns (rows, index into parts of each row)
+    def locate(self, parts):
+        codes = self.names.get_indexer(list(parts))
+        found = np.flatnonzero(codes >= 0)
+        if self.unique:
+            return codes[found], found
+        # Duplicate part names: every row carrying a name belongs to it
+        order = np.argsort(codes[found], kind='stable')
+        wanted = codes[found][order]
+        rows = np.flatnonzero(np.isin(self.codes, wanted))
+        return rows, found[order][np.searchsorted(wanted, self.codes[rows])]
+
+    # Function to add deltas to the stock of a batch of parts in place; returns (touched rows, part -> new stock)
+    def add_stock(self, deltas):
+        rows, which = self.locate(deltas.keys())
+        values = self.stock[rows].astype(np.int64) + np.fromiter(deltas.values(), np.int64, len(deltas))[which]
+        self.stock[rows] = check_stock_range(values)
+        return rows, dict(zip(self.names[self.codes[rows]], values.tolist()))
+
+    # Function to overwrite the stock of a batch of parts in place; returns the touched rows
+    def set_stock(self, new_stock):
+        rows, which = self.locate(new_stock.keys())
+        self.stock[rows] = check_stock_range(np.fromiter(new_stock.values(), np.int64, len(new_stock))[which])
+        return rows
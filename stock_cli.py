@@ -0,0 +1,170 @@
+"""Headless stock tool for cron jobs and bulk imports; does not load Streamlit.
+
+    python stock_cli.py apply goods_received.csv [--chunksize 100000] [--reason received]
+    python stock_cli.py import-excel Stock3.xlsx
+    python stock_cli.py export-excel stock_export.xlsx
+    python stock_cli.py what-if shipments.csv [--workers 8] [--output buildable.csv]
+    python stock_cli.py alerts [--deliver] [--limit 100]
+
+Movement files (CSV or XLSX) need Parts and Quantity columns, Quantity being the signed change;
+an optional Reason column overrides --reason per row.
+What-if files need Scenario, Parts and Quantity columns: the stock each scenario would receive.
+The alerts command prints low-stock alerts waiting in the outbox; --deliver marks them sent, for notifier scripts.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+import stock_core
+from excel_stream import iter_row_batches
+from stock_service import apply_stock_deltas
+from storage import export_excel, import_excel
+
+
+# Function to yield chunks of a movements file, CSV or XLSX
+def iter_movement_chunks(path, chunksize):
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        return iter_row_batches(path, chunksize)
+    return pd.read_csv(path, chunksize=chunksize)
+
+
+# Function to sum a movements file into (reason, part) -> delta, one chunk at a time
+def aggregate_movements(path, chunksize, default_reason):
+    partial_sums = []
+    rows = 0
+    for chunk in iter_movement_chunks(path, chunksize):
+        missing = {'Parts', 'Quantity'} - set(chunk.columns)
+        if missing:
+            raise ValueError(f"Movements file is missing column(s): {', '.join(sorted(missing))}")
+        quantity = pd.to_numeric(chunk['Quantity'], errors='coerce')
+        if quantity.isna().any() or (quantity % 1 != 0).any():
+            raise ValueError("Every Quantity in the movements file must be a whole number")
+        reason = chunk['Reason'].fillna(default_reason) if 'Reason' in chunk.columns else default_reason
+        chunk = pd.DataFrame({'Reason': reason, 'Parts': chunk['Parts'].astype(str),
+                              'Quantity': quantity.astype('int64')})
+        partial_sums.append(chunk.groupby(['Reason', 'Parts'])['Quantity'].sum())
+        rows += len(chunk)
+    if not partial_sums:
+        return pd.Series(dtype='int64'), rows
+    return pd.concat(partial_sums).groupby(level=[0, 1]).sum(), rows
+
+
+# Function to read a what-if CSV into scenario names and one {part: quantity} dict per scenario
+def read_scenarios(path):
+    rows = pd.read_csv(path)
+    missing = {'Scenario', 'Parts', 'Quantity'} - set(rows.columns)
+    if missing:
+        raise ValueError(f"What-if file is missing column(s): {', '.join(sorted(missing))}")
+    quantity = pd.to_numeric(rows['Quantity'], errors='coerce')
+    if quantity.isna().any() or (quantity % 1 != 0).any():
+        raise ValueError("Every Quantity in the what-if file must be a whole number")
+    totals = quantity.astype('int64').groupby([rows['Scenario'].astype(str), rows['Parts'].astype(str)],
+                                              sort=False).sum()
+    names = list(dict.fromkeys(totals.index.get_level_values(0)))
+    return names, [totals[name].to_dict() for name in names]
+
+
+def what_if_command(args):
+    start = time.perf_counter()
+    names, scenarios = read_scenarios(args.file)
+    state = stock_core.load_stock_state()
+    counts = stock_core.what_if(state, scenarios, args.workers)
+    counts.insert(0, 'Scenario', names)
+    if args.output:
+        counts.to_csv(args.output, index=False)
+    else:
+        print(counts.to_string(index=False))
+    print(f"{len(scenarios)} scenarios in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+def print_alert(alert):
+    print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(alert['created']))} [{alert['event']}] {alert['message']}")
+
+
+# Function to warn on stderr that alerts could not be written to the outbox; the stock change itself was saved
+def report_alert_error():
+    if stock_core.alert_engine is not None and stock_core.alert_engine.last_error is not None:
+        print(f"Low-stock alerts were not recorded: {stock_core.alert_engine.last_error}", file=sys.stderr)
+
+
+def alerts_command(args):
+    if stock_core.alert_engine is None:
+        print("Alerts are turned off (STOCK_ALERTS=0)", file=sys.stderr)
+        return
+    outbox = stock_core.alert_engine.outbox
+    try:
+        if args.deliver:
+            count = outbox.drain(print_alert, args.limit)
+        else:
+            pending = outbox.pending(args.limit)
+            for alert in pending:
+                print_alert(alert)
+            count = len(pending)
+    except sqlite3.Error as error:
+        # Non-zero exit, so a notifier cron job notices the outbox is unreadable
+        sys.exit(f"Alert outbox unavailable: {error}")
+    print(f"{count} alert(s){' delivered' if args.deliver else ' pending'}", file=sys.stderr)
+
+
+def apply_command(args):
+    start = time.perf_counter()
+    totals, rows = aggregate_movements(args.file, args.chunksize, args.reason)
+    known = set(stock_core.load_stock_data()['Parts'])
+    unknown = sorted({part for _, part in totals.index if part not in known})
+    totals = totals[[part in known for _, part in totals.index]]
+    totals = totals[totals != 0]
+    # One write per reason; a plain goods-received file is a single write
+    if not args.dry_run:
+        for reason, deltas in totals.groupby(level=0):
+            apply_stock_deltas(stock_core.storage, deltas.droplevel(0).to_dict(), reason)
+    if not args.dry_run and stock_core.alert_engine is not None:
+        # Check the new stock against the alert thresholds, whether or not the app is running
+        stock_core.alert_engine.evaluate(stock_core.load_stock_state())
+        report_alert_error()
+    elapsed = time.perf_counter() - start
+    print(f"{rows} movements, {totals.index.get_level_values(1).nunique()} parts changed "
+          f"in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} movements/s)"
+          + (" [dry run]" if args.dry_run else ""))
+    if unknown:
+        print(f"Skipped {len(unknown)} unknown part(s): {', '.join(unknown[:10])}"
+              + (" ..." if len(unknown) > 10 else ""), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    apply_parser = commands.add_parser('apply', help='apply a CSV/XLSX file of stock movements')
+    apply_parser.add_argument('file')
+    apply_parser.add_argument('--chunksize', type=int, default=100_000)
+    apply_parser.add_argument('--reason', default='received')
+    apply_parser.add_argument('--dry-run', action='store_true')
+    import_parser = commands.add_parser('import-excel', help='replace stored stock with a workbook')
+    import_parser.add_argument('file')
+    export_parser = commands.add_parser('export-excel', help='write stored stock to a workbook')
+    export_parser.add_argument('file')
+    what_if_parser = commands.add_parser('what-if', help='buildable vehicles per model for each stock scenario')
+    what_if_parser.add_argument('file')
+    what_if_parser.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    what_if_parser.add_argument('--output', help='write the results to this CSV instead of printing them')
+    alerts_parser = commands.add_parser('alerts', help='print low-stock alerts waiting in the outbox')
+    alerts_parser.add_argument('--deliver', action='store_true', help='mark the printed alerts as delivered')
+    alerts_parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    if args.command == 'apply':
+        apply_command(args)
+    elif args.command == 'import-excel':
+        import_excel(stock_core.storage, args.file)
+    elif args.command == 'export-excel':
+        export_excel(stock_core.storage, args.file)
+    elif args.command == 'what-if':
+        what_if_command(args)
+    elif args.command == 'alerts':
+        alerts_command(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+import copy
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from alerts import AlertEngine, AlertOutbox
+from bom import explode_requirements
+from instrumentation import span, timed
+from forecast import SECONDS_PER_DAY, consumption_rates, forecast_stock
+from journal import JournalStorage, load_movements, movement_files
+from locations import LocationStock, LocationStore
+from producibility import ProducibilityIndex, batch_demand, buildable_counts
+from scenarios import evaluate_scenarios
+from stock_arrays import StockTable
+from stock_service import apply_stock_deltas
+from stock_table import BandIndex, band_edges
+from storage import get_storage, import_excel, stat_key
+from workbook_cache import read_workbook
+from write_behind import WriteBehindQueue
+
+# Define the Excel file paths
+stock_file_path = 'Stock3.xlsx'
+parts_file_path = 'Stock3.xlsx'
+bom_file_path = 'BOM.xlsx'
+
+# Storage backend for stock: 'journal' appends movements, 'excel' rewrites the workbook, 'sqlite' updates single rows.
+# With 'journal' the snapshot and journal own Stock and the workbook's Stock column is only the opening balance
+storage_backend = os.environ.get('STOCK_BACKEND', 'journal')
+stock_db_path = 'stock.db'
+stock_journal_path = 'stock_journal.csv'
+stock_snapshot_path = 'stock_snapshot.json'
+storage = get_storage(storage_backend, stock_file_path, stock_db_path, stock_journal_path, stock_snapshot_path)
+
+# Seconds a stock change may wait in memory so later changes share its write; 0 writes before returning.
+# On by default for the Excel backend, where every write rewrites the workbook
+write_behind_delay = float(os.environ.get('STOCK_WRITE_BEHIND', '1' if storage_backend == 'excel' else '0'))
+write_queue = WriteBehindQueue(storage, write_behind_delay) if write_behind_delay > 0 else None
+
+# Stock locations, default first: receipts, removals and production are booked at the default location,
+# and transfers move stock between locations
+stock_locations = [name.strip() for name in os.environ.get('STOCK_LOCATIONS', 'Main store').split(',') if name.strip()]
+stock_locations_path = 'stock_locations.csv'
+location_store = LocationStore(stock_locations_path, stock_locations)
+all_locations = 'All locations'
+
+# Vehicle models, each a requirement column of the stock sheet; other columns (Unit, Supplier, 'Lead time (days)',
+# 'Minimum stock', ...) are per-part attributes. STOCK_MODELS lists the models for a sheet that has others
+vehicle_models = [name.strip() for name in os.environ.get('STOCK_MODELS', 'Round Model,Loader,Flexi Model').split(',')
+                  if name.strip()]
+
+# Low-stock alerts, checked as stock changes and written to an outbox a notifier drains (stock_cli.py alerts):
+# a part below its 'Minimum stock' (default: below 0) or a model with fewer buildable vehicles than
+# STOCK_ALERT_MIN_BUILDABLE. STOCK_ALERTS=0 turns them off
+stock_alerts_path = 'stock_alerts.db'
+alert_engine = (AlertEngine(AlertOutbox(stock_alerts_path), int(os.environ.get('STOCK_ALERT_MIN_BUILDABLE', '1')))
+                if os.environ.get('STOCK_ALERTS', '1') != '0' else None)
+
+
+# Function to load parts requirements from the Excel file, with sub-assemblies exploded into leaf parts
+def load_parts_requirements():
+    df = read_workbook(parts_file_path)
+    model_parts_requirements = {}
+    # Configured models the sheet has a requirement column for, in configured order
+    for model in [model for model in vehicle_models if model in df.columns]:
+        model_parts_requirements[model] = df.set_index('Parts')[model].to_dict()
+    return explode_requirements(model_parts_requirements, bom_file_path)
+
+
+# Function to load stock data from the Excel file
+@timed('load', rows=len)
+def load_stock_data():
+    try:
+        df = storage.load() if write_queue is None else write_queue.load()
+    except FileNotFoundError:
+        if storage_backend == 'sqlite' and os.path.exists(stock_file_path):
+            # First run on SQLite: seed the database from the workbook
+            import_excel(storage, stock_file_path)
+            return storage.load()
+        parts = {
+            "Motor": 10,
+            "Battery": 10,
+            "Controller": 10,
+            "Throttle": 10,
+            "Brake": 10,
+            "Frame": 10,
+            "Wheels": 10,
+            "Charger": 10,
+            "Seat": 10,
+            "Suspension": 10
+        }
+        df = pd.DataFrame(parts.items(), columns=['Parts', 'Stock'])
+        storage.save(df)
+    return df
+
+
+# Function to save stock data, optionally only the rows of the given parts
+def save_stock_data(df, parts=None):
+    if write_queue is not None:
+        # Queued changes were made against the stock before this save; write them first
+        write_queue.flush()
+    if parts is None:
+        storage.save(df)
+    else:
+        storage.save_parts(df, parts)
+
+
+# Compact stock table with the requirements and producibility index that stay in sync with it
+class StockState:
+    def __init__(self, df, parts_requirements, locations=None):
+        with span('compute', rows=len(df)):
+            self._build(df, parts_requirements, locations)
+
+    def _build(self, df, parts_requirements, locations):
+        self.parts_requirements = parts_requirements
+        self.locations = locations if locations is not None else LocationStock(df['Parts'], stock_locations)
+        self.table = StockTable(df)
+        # Per-location views of this state, built on first use; a published state never changes, so they stay valid
+        self.location_views = {}
+        # Producible quantities, kept up to date incrementally as stock changes
+        self.producibility = ProducibilityIndex(df['Parts'], self.table.stock, parts_requirements)
+        self.producibility.write_columns(self.table)
+        if "Required per vehicle" in self.table.arrays:
+            self.table.set_column("E-Rickshaws that can be made",
+                                  self.table.stock // self.table.arrays["Required per vehicle"])
+        # Stock band of every row per producible-quantity column, used for both filtering and colouring
+        band_columns = [column for column in self.table.columns if column.endswith(" that can be made")]
+        self.bands = {column: BandIndex(self.df.index, self.table.arrays[column], band_edges(column))
+                      for column in band_columns}
+
+    # Read-only frame over the table; it follows the table's in-place changes
+    @property
+    def df(self):
+        return self.table.frame()
+
+    # Function to view some columns as a read-only frame without copying them
+    def frame(self, columns):
+        return self.table.frame(columns)
+
+    def buildable(self):
+        return self.producibility.buildable()
+
+    # Function to copy the state so it can be changed while others keep reading the original
+    def copy(self):
+        clone = copy.copy(self)
+        clone.table = self.table.copy()
+        clone.producibility = self.producibility.copy()
+        clone.bands = {column: band_index.copy() for column, band_index in self.bands.items()}
+        clone.location_views = {}
+        return clone
+
+    # Function to report per-part shortfalls for building count of a model, in memory; returns (report, max buildable)
+    def shortages(self, model, count):
+        return self.producibility.shortages(model, count, self.table.parts(), self.table.stock)
+
+
+# Function to load the requirements and stock into a StockState
+def load_stock_state():
+    df = load_stock_data()
+    return StockState(df, load_parts_requirements(), location_store.load(df['Parts']))
+
+
+# Function to get the StockState of one location, with its own producible counts; all locations gives the state itself.
+# Built once per location and state, so reruns that show the same stock reuse it
+def location_state(state, location):
+    if location == all_locations:
+        return state
+    view = state.location_views.get(location)
+    if view is None:
+        df = state.df.copy()
+        df['Stock'] = state.locations.location_stock(location, state.table.stock)
+        view = state.location_views[location] = StockState(df, state.parts_requirements, state.locations)
+    return view
+
+
+# Function to compute location -> {model: buildable count} for every location in one vectorized pass
+def buildable_by_location(state):
+    matrix = state.producibility.matrix
+    stock = state.locations.stock_matrix(state.table.stock)
+    required = matrix > 0
+    # parts x locations x models
+    producible = np.where(required[:, None, :], stock[:, :, None] // np.where(required, matrix, 1)[:, None, :], 0)
+    return {location: dict(zip(state.producibility.models, buildable_counts(producible[:, i], matrix).tolist()))
+            for i, location in enumerate(state.locations.locations)}
+
+
+# Consumption rates from the last forecast, reused until the journal files, the day or the parameters change
+_rates = {'key': None, 'parts': None, 'rates': None}
+_rates_lock = threading.Lock()
+
+
+# Function to forecast stock-outs and reorder quantities for every part from the journal's consumption history;
+# returns None when the storage backend keeps no history
+@timed('forecast')
+def consumption_forecast(state, lead_time_days=14, halflife_days=14, review_days=30):
+    if not isinstance(storage, JournalStorage):
+        return None
+    now = time.time()
+    files = movement_files(storage)
+    key = (tuple(files), int(now // SECONDS_PER_DAY), halflife_days)
+    parts = state.df['Parts']
+    with _rates_lock:
+        if _rates['key'] != key or not _rates['parts'].equals(parts):
+            rates = consumption_rates(load_movements(storage, files), parts, now, halflife_days)
+            _rates.update(key=key, parts=parts.copy(), rates=rates)
+        mean, std = _rates['rates']
+    # A per-part lead time column in the workbook overrides the default
+    if 'Lead time (days)' in state.df.columns:
+        lead_times = pd.to_numeric(state.df['Lead time (days)'], errors='coerce').fillna(lead_time_days).to_numpy()
+    else:
+        lead_times = lead_time_days
+    return forecast_stock(parts, state.table.stock, mean, std, lead_times, now, review_days)
+
+
+# Function to evaluate "what if this stock arrives" scenarios on all cores: scenarios are {part: quantity} dicts or
+# a scenarios x parts array of deltas; returns the buildable count per model for each scenario
+def what_if(state, scenarios, workers=None):
+    return evaluate_scenarios(state.df['Parts'], state.table.stock, state.parts_requirements, scenarios, workers)
+
+
+# Function to move stock between locations as one atomic batch of paired movements; total stock is unchanged.
+# The source must hold the quantity; the journal backend records both movements of every transfer
+def transfer_stock(state, transfers):
+    record = record_transfers if isinstance(storage, JournalStorage) else None
+    state.locations = location_store.transfer(state.df['Parts'], state.table.stock, transfers, record)
+    state.location_views = {}
+    return state.locations
+
+
+# Function to write transfers to the journal as an out and an in movement per part
+def record_transfers(transfers):
+    storage.record_movements([(part, sign * int(quantity), 'transfer', f"{source} -> {target}")
+                              for part, source, target, quantity in transfers for sign in (-1, 1)])
+
+
+# Function to identify the stored stock, its split across locations and the requirements cheaply; changes when any
+# process changes the stock or locations, or someone edits the requirement sheet or the BOM
+def stored_version():
+    return storage.version(), location_store.version(), stat_key(parts_file_path), stat_key(bom_file_path)
+
+
+# Function to list the parts a stock selection touches
+def selected_part_names(df, selected_parts):
+    if "All stock" in selected_parts:
+        return df['Parts'].tolist()
+    return list(selected_parts)
+
+
+# Function to apply stock deltas to the stored stock and refresh the state with the quantities it now holds
+def apply_stock_changes(state, deltas, reason, model=None):
+    with span('mutate', rows=len(deltas)):
+        return _apply_stock_changes(state, deltas, reason, model)
+
+
+def _apply_stock_changes(state, deltas, reason, model):
+    deltas = {part: delta for part, delta in deltas.items() if delta}
+    # Apply in memory first, so stock pushed outside the int32 range raises before anything is written
+    positions, _ = state.table.add_stock(deltas)
+    if write_queue is None:
+        # Take the quantities storage now holds, which include other processes' changes
+        positions = state.table.set_stock(apply_stock_deltas(storage, deltas, reason, model))
+    else:
+        # The queue writes the change to storage in the background
+        write_queue.submit(deltas, reason, model)
+    df = refresh_producible(state, positions)
+    if alert_engine is not None:
+        with span('alerts', rows=len(positions)):
+            alert_engine.evaluate(state, positions)
+    return df
+
+
+# Function to recompute producible counts for the touched rows only
+def refresh_producible(state, positions):
+    with span('compute.refresh', rows=len(positions)):
+        return _refresh_producible(state, positions)
+
+
+def _refresh_producible(state, positions):
+    table = state.table
+    state.producibility.update(positions, table.stock)
+    state.producibility.write_columns(table, positions)
+    if "E-Rickshaws that can be made" in table.arrays:
+        table.arrays["E-Rickshaws that can be made"][positions] = (
+            table.stock[positions] // table.arrays["Required per vehicle"][positions])
+    for column, band_index in state.bands.items():
+        band_index.update(positions, table.arrays[column])
+    return state.df
+
+
+# Function to decrement stock for a whole production batch (model -> count) in one write, allowing negative values
+def record_production_batch(state, counts):
+    counts = {model: int(count) for model, count in counts.items() if count}
+    demand = batch_demand(state.producibility.models, state.producibility.matrix, counts)
+    rows = np.flatnonzero(demand)
+    deltas = dict(zip(state.table.names[state.table.codes[rows]], (-demand[rows]).tolist()))
+    batch = "; ".join(f"{model} x{count}" for model, count in counts.items())
+    return apply_stock_changes(state, deltas, 'production', batch), True
+
+
+# Function to decrement stock for custom number of rickshaws, allowing negative values
+def decrement_stock(state, num_rickshaws, model):
+    return record_production_batch(state, {model: num_rickshaws})
+
+
+# Function to read a production batch CSV with Model and Count columns into model -> count
+def read_production_batch(csv_file):
+    builds = pd.read_csv(csv_file)
+    missing = {'Model', 'Count'} - set(builds.columns)
+    if missing:
+        raise ValueError(f"Production batch CSV is missing column(s): {', '.join(sorted(missing))}")
+    counts = pd.to_numeric(builds['Count'], errors='coerce')
+    if counts.isna().any() or (counts % 1 != 0).any():
+        raise ValueError("Every Count in the production batch CSV must be a whole number")
+    return counts.astype(int).groupby(builds['Model'].astype(str).str.strip()).sum().to_dict()
+
+
+# Function to increment stock
+def increment_stock(state, selected_parts, quantity):
+    deltas = dict.fromkeys(selected_part_names(state.df, selected_parts), int(quantity))
+    return apply_stock_changes(state, deltas, 'received')
+
+
+# Function to decrement custom stock, allowing negative values
+def decrement_custom_stock(state, selected_parts, quantity):
+    deltas = dict.fromkeys(selected_part_names(state.df, selected_parts), -int(quantity))
+    return apply_stock_changes(state, deltas, 'removed'), True
@@ -0,0 +1,41 @@
+import random
+import time
+
+from instrumentation import timed
+from storage import StockConflict
+
+
+# Function to apply part -> delta changes atomically to the stored stock, retrying while another writer holds it
+@timed('save', rows=len)
+def apply_stock_deltas(storage, deltas, reason=None, model=None, retries=200, backoff=0.005):
+    return _apply_with_retry(storage, deltas, reason, model, retries, backoff)
+
+
+# Function to write several (reason, model) -> {part: delta} groups as one storage write. A backend that journals
+# movements keeps each group's reason and model; the others get the deltas summed per part. Returns the rows written
+@timed('save', rows=len)
+def apply_stock_groups(storage, groups, retries=200, backoff=0.005):
+    if hasattr(storage, 'record_movements'):
+        records = [(part, int(delta), reason, model)
+                   for (reason, model), deltas in groups.items() for part, delta in deltas.items() if delta]
+        if records:
+            storage.record_movements(records)
+        return records
+    totals = {}
+    for deltas in groups.values():
+        for part, delta in deltas.items():
+            totals[part] = totals.get(part, 0) + int(delta)
+    return _apply_with_retry(storage, totals, None, None, retries, backoff)
+
+
+def _apply_with_retry(storage, deltas, reason, model, retries, backoff):
+    deltas = {part: int(delta) for part, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+    for attempt in range(retries):
+        try:
+            return storage.apply_deltas(deltas, reason, model)
+        except StockConflict:
+            # Jittered, growing wait so competing sessions don't retry in lockstep
+            time.sleep(backoff * min(attempt + 1, 20) * random.uniform(0.5, 1.5))
+    raise StockConflict(f"Gave up after {retries} attempts")
@@ -0,0 +1,117 @@
+import threading
+from contextlib import contextmanager
+
+import stock_core
+
+
+# Readers-writer lock: many readers at once, writers alone; waiting writers go ahead of new readers
+class RWLock:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._writing and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            self._condition.wait_for(lambda: not self._writing and not self._readers)
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+# One StockState per process, shared by every session. A published state is never changed: mutate() works on
+# a copy and publishes it under the write lock, so readers can keep a snapshot for a whole rerun without
+# holding a lock. Each change bumps version, which sessions poll to rerun; changes made by other processes are
+# picked up by reloading when the storage version moves.
+class StockStore:
+    def __init__(self):
+        self._lock = RWLock()
+        self.version = 0
+        self.reloads = 0
+        self._reload()
+        if stock_core.write_queue is not None:
+            # Our queued changes reaching storage are already in the state; no need to reload for them
+            stock_core.write_queue.flush_listeners.append(self._flushed)
+
+    # Function to reload the state from storage; call with the write lock held
+    def _reload(self):
+        self._storage_version = stock_core.stored_version()
+        self.state = stock_core.load_stock_state()
+        self.reloads += 1
+        if stock_core.alert_engine is not None:
+            # Stock changed elsewhere (imports, the CLI, other processes) is checked against the alert thresholds here
+            stock_core.alert_engine.evaluate(self.state)
+
+    # Function to reload if another process changed the stored stock since we last saw it
+    def refresh(self):
+        if stock_core.stored_version() == self._storage_version:
+            return False
+        with self._lock.write():
+            if stock_core.stored_version() == self._storage_version:
+                return False
+            self._reload()
+            self.version += 1
+        return True
+
+    # Function to adopt the storage version our queue's write left, unless another process wrote before it
+    def _flushed(self, version_before, version_after):
+        with self._lock.write():
+            storage_version, *others = self._storage_version
+            if version_before == storage_version:
+                self._storage_version = (version_after, *others)
+
+    # Function to get the current StockState; treat it as read-only
+    def snapshot(self):
+        self.refresh()
+        with self._lock.read():
+            return self.state
+
+    # Function to run a stock_core mutation, e.g. mutate(increment_stock, parts, 5), and publish its result;
+    # if it raises, the published state is left as it was
+    def mutate(self, func, *args, **kwargs):
+        with self._lock.write():
+            version_before = stock_core.stored_version()
+            state = self.state.copy()
+            result = func(state, *args, **kwargs)
+            if version_before == self._storage_version:
+                self.state = state
+                # Our own write moved the storage version; don't mistake it for another process's change
+                self._storage_version = stock_core.stored_version()
+            else:
+                # Another process wrote since we last loaded; adopting the new version would hide its change
+                self._reload()
+            self.version += 1
+        return result
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Function to get the process-wide store, loading it on first use
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StockStore()
+        return _store
@@ -0,0 +1,113 @@
+import copy
+import math
+
+import numpy as np
+
+# Colour per stock band, lowest band first; quantities above the last edge are green
+BAND_STYLES = (
+    'background-color: #8B0000; color: white',  # Dark red for no stock
+    'background-color: #FF0000',  # Red for low stock
+    'background-color: #FFA500',  # Orange for medium stock
+    'background-color: #90EE90',  # Green for high stock
+)
+# Inclusive upper edge of every band but the last: 0 or less, 1-100, 101-200, 200+
+DEFAULT_BAND_EDGES = (0, 100, 200)
+# Band edges for particular quantity columns, e.g. {"Loaders that can be made": (0, 20, 50)}
+BAND_EDGES = {}
+
+
+# Function to get the band edges configured for a quantity column
+def band_edges(column):
+    return tuple(BAND_EDGES.get(column, DEFAULT_BAND_EDGES))
+
+
+# Function to name the bands that edges define, e.g. ('0 or less', '1-100', '101-200', '200+')
+def band_labels(edges):
+    labels = [f"{edges[0]} or less"]
+    labels += [f"{low + 1}-{high}" for low, high in zip(edges, edges[1:])]
+    return tuple(labels + [f"{edges[-1]}+"])
+
+
+# Function to map quantities to band numbers in one vectorized pass: a quantity equal to an edge falls in the band
+# below it; missing quantities land in the top band
+def assign_bands(values, edges):
+    return np.searchsorted(np.asarray(edges, dtype=float), np.asarray(values, dtype=float), side='left').astype(np.int8)
+
+
+# Function to map band numbers to their styles
+def band_styles(bands, styles=BAND_STYLES):
+    # Configurations with more bands than colours reuse the top colour
+    return np.asarray(styles)[np.minimum(bands, len(styles) - 1)]
+
+
+# Band of every row of one quantity column, with the rows of each band kept ready for filtering
+class BandIndex:
+    def __init__(self, index, values, edges=DEFAULT_BAND_EDGES):
+        self.index = index
+        self.edges = tuple(edges)
+        self.labels = band_labels(self.edges)
+        self.bands = assign_bands(values, self.edges)
+        # Sorted positions per band, rebuilt lazily from the int8 bands only for bands whose membership changed
+        self._positions = [None] * len(self.labels)
+
+    # Function to copy the index; built position arrays are never changed in place and are shared
+    def copy(self):
+        clone = copy.copy(self)
+        clone.bands = self.bands.copy()
+        clone._positions = list(self._positions)
+        return clone
+
+    # Function to re-band only the given rows from the full quantity array; O(k) for k touched rows
+    def update(self, positions, values):
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        new_bands = assign_bands(np.asarray(values)[positions], self.edges)
+        old_bands = self.bands[positions]
+        changed = old_bands != new_bands
+        for band in np.union1d(old_bands[changed], new_bands[changed]).tolist():
+            self._positions[band] = None
+        self.bands[positions] = new_bands
+
+    # Function to list the row positions in a band, by label
+    def positions(self, label):
+        band = self.labels.index(label)
+        if self._positions[band] is None:
+            self._positions[band] = np.flatnonzero(self.bands == band)
+        return self._positions[band]
+
+    # Function to keep the rows of a frame aligned with this index that fall in a band; 'All' keeps every row
+    def select(self, df, label):
+        if label == 'All':
+            return df
+        return df.iloc[self.positions(label)]
+
+    # Function to get the bands of rows by index label
+    def bands_for(self, labels):
+        return self.bands[self.index.get_indexer(labels)]
+
+
+# Function to count the pages a table of n rows needs
+def page_count(n_rows, page_size):
+    return max(1, math.ceil(n_rows / page_size))
+
+
+# Function to cut one sorted page out of a table; pages are numbered from 1 and clamped to the last page
+def table_page(df, page=1, page_size=100, sort_by=None, ascending=True):
+    page = min(max(int(page), 1), page_count(len(df), page_size))
+    start = (page - 1) * page_size
+    if sort_by is None:
+        return df.iloc[start:start + page_size]
+    values = df[sort_by].to_numpy()
+    # Stable sort of positions only; rows are materialized for the visible page alone
+    if ascending:
+        order = np.argsort(values, kind='stable')
+    elif values.dtype.kind in 'iuf':
+        order = np.argsort(-values, kind='stable')
+    else:
+        order = np.argsort(values, kind='stable')[::-1]
+    return df.iloc[order[start:start + page_size]]
+
+
+# Function to colour a page's banded column from the band index, leaving the other columns unstyled
+def style_page(page_df, band_index, column):
+    styles = band_styles(band_index.bands_for(page_df.index))
+    return page_df.style.apply(lambda values: styles, subset=[column])
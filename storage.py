@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from instrumentation import span
+from part_index import build_part_index, add_stock
+from workbook_cache import read_workbook, saved
+
+
+# Function to identify a file's on-disk version, None if it does not exist
+def stat_key(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+# Raised when another writer holds the stock; the caller should retry
+class StockConflict(Exception):
+    pass
+
+
+# Function to hold an exclusive lock on a lock file; unless blocking, raise StockConflict if it is taken
+@contextmanager
+def file_lock(lock_path, blocking=False):
+    with open(lock_path, 'a+') as lock_file:
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise StockConflict(lock_path)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Stock kept in an Excel workbook; every save rewrites the whole file
+class ExcelStorage:
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        return read_workbook(self.path)
+
+    # Function to identify the stored stock cheaply; it changes whenever any writer changes the stock
+    def version(self):
+        return stat_key(self.path)
+
+    # Write to a temp file and rename it over the workbook, so readers never see a half-written file
+    def save(self, df):
+        fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(os.path.abspath(self.path)))
+        os.close(fd)
+        try:
+            with span('save.workbook', rows=len(df)):
+                df.to_excel(tmp_path, index=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                # Interrupted after the rename: the temp file already is the workbook
+                pass
+            raise
+        saved(self.path, df)
+
+    # Excel cannot update single cells cheaply, so persisting a few parts is a full save
+    def save_parts(self, df, parts):
+        self.save(df)
+
+    # Read-modify-write under the lock file; the workbook is re-read so no other writer's change is lost. Waits for
+    # the lock, as another writer's rewrite of a large workbook can take longer than any sensible retry budget
+    def apply_deltas(self, deltas, reason=None, model=None):
+        with file_lock(self.lock_path, blocking=True):
+            df = pd.read_excel(self.path)
+            new_stock = add_stock(df, build_part_index(df), deltas)
+            self.save(df)
+        return new_stock
+
+
+# Stock kept in a SQLite database in WAL mode; a stock change is a per-row UPDATE. The workbook at
+# catalogue_path still holds the requirements, so its edits count as a new version too
+class SQLiteStorage:
+    table = 'stock'
+
+    def __init__(self, path, catalogue_path=None):
+        self.path = path
+        self.catalogue_path = catalogue_path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def exists(self):
+        if not os.path.exists(self.path):
+            return False
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                               (self.table,)).fetchone()
+        return row is not None
+
+    # WAL mode commits land in the -wal file until a checkpoint folds them into the database
+    def version(self):
+        catalogue = stat_key(self.catalogue_path) if self.catalogue_path is not None else None
+        return stat_key(self.path), stat_key(self.path + '-wal'), catalogue
+
+    def load(self):
+        if not self.exists():
+            raise FileNotFoundError(self.path)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(f'SELECT * FROM "{self.table}" ORDER BY rowid', conn)
+
+    # Replace the whole table, used for imports and first-time setup
+    def save(self, df):
+        with closing(self._connect()) as conn:
+            with conn:
+                df.to_sql(self.table, conn, if_exists='replace', index=False)
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "{self.table}_parts" ON "{self.table}" ("Parts")')
+
+    # Write only the Stock of the given parts, in one transaction
+    def save_parts(self, df, parts):
+        rows = df.loc[df['Parts'].isin(list(parts)), ['Stock', 'Parts']]
+        values = [(int(stock), part) for stock, part in rows.itertuples(index=False)]
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.executemany(f'UPDATE "{self.table}" SET "Stock" = ? WHERE "Parts" = ?', values)
+
+    # Add deltas inside one write transaction; a busy database surfaces as StockConflict
+    def apply_deltas(self, deltas, reason=None, model=None):
+        items = [(int(delta), part) for part, delta in deltas.items()]
+        try:
+            with closing(self._connect()) as conn:
+                conn.isolation_level = None
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany(f'UPDATE "{self.table}" SET "Stock" = "Stock" + ? WHERE "Parts" = ?', items)
+                    new_stock = {}
+                    for _, part in items:
+                        row = conn.execute(f'SELECT "Stock" FROM "{self.table}" WHERE "Parts" = ?',
+                                           (part,)).fetchone()
+                        if row is not None:
+                            new_stock[part] = int(row[0])
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+        except sqlite3.OperationalError as error:
+            if 'locked' in str(error) or 'busy' in str(error):
+                raise StockConflict(self.path) from error
+            raise
+        return new_stock
+
+
+# Function to create the storage backend by name
+def get_storage(backend, excel_path, db_path=None, journal_path=None, snapshot_path=None):
+    if backend == 'sqlite':
+        return SQLiteStorage(db_path, excel_path)
+    if backend == 'excel':
+        return ExcelStorage(excel_path)
+    if backend == 'journal':
+        from journal import JournalStorage
+        return JournalStorage(ExcelStorage(excel_path), journal_path, snapshot_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# Function to import an Excel workbook into a storage backend
+def import_excel(storage, excel_path):
+    storage.save(pd.read_excel(excel_path))
+
+
+# Function to export a storage backend to an Excel workbook
+def export_excel(storage, excel_path):
+    storage.load().to_excel(excel_path, index=False)
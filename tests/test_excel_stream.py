@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from excel_stream import ColumnBuilder
+
+
+def test_column_widened_to_text_keeps_its_empty_cells_empty():
+    builder = ColumnBuilder('int', capacity=2)
+    builder.append(pd.Series([None, 0], dtype=object))
+    builder.append(pd.Series([5, None, 0], dtype=object))
+    builder.append(pd.Series(['Hub', None], dtype=object))
+    column = builder.finish()
+    assert column.dtype == 'category'
+    assert column.astype(object).where(column.notna(), None).tolist() == [None, 0, 5, None, 0, 'Hub', None]
+
+
+def test_column_widened_to_float_keeps_its_empty_cells_missing():
+    builder = ColumnBuilder('int', capacity=2)
+    builder.append(pd.Series([None, 2], dtype=object))
+    builder.append(pd.Series([1.5], dtype=object))
+    np.testing.assert_array_equal(builder.finish().to_numpy(), [np.nan, 2, 1.5])
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from journal import JournalStorage
+from storage import ExcelStorage
+
+
+def make_storage(tmp_path, stock):
+    path = str(tmp_path / 'stock.xlsx')
+    pd.DataFrame({'Parts': ['Motor', 'Battery'], 'Stock': stock}).to_excel(path, index=False)
+    storage = JournalStorage(ExcelStorage(path), str(tmp_path / 'journal.csv'), str(tmp_path / 'snapshot.json'),
+                             compact_bytes=float('inf'))
+    return path, storage
+
+
+# Function to read stock as a fresh process would, without the storage's cached totals
+def stock_of(storage):
+    df = JournalStorage(storage.catalogue, storage.journal_path, storage.snapshot_path).load()
+    return dict(zip(df['Parts'], df['Stock']))
+
+
+def test_workbook_stock_is_only_the_opening_balance(tmp_path):
+    path, storage = make_storage(tmp_path, [10, 5])
+    storage.apply_deltas({'Motor': -3}, 'used', 'Round Model')
+    # Someone types the current count into the workbook; the journalled movement is not counted again
+    pd.DataFrame({'Parts': ['Motor', 'Battery', 'Wheel'], 'Stock': [7, 50, 4]}).to_excel(path, index=False)
+    assert stock_of(storage) == {'Motor': 7, 'Battery': 5, 'Wheel': 4}
+
+
+def test_compaction_leaves_the_workbook_alone(tmp_path):
+    path, storage = make_storage(tmp_path, [10, 5])
+    storage.apply_deltas({'Motor': -3, 'Battery': 2}, 'used', 'Round Model')
+    before = open(path, 'rb').read()
+    storage.compact()
+    assert open(path, 'rb').read() == before
+    assert stock_of(storage) == {'Motor': 7, 'Battery': 7}
@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks.kill_flush import CHANGES, open_storage, run
+from journal import load_movements
+
+
+@pytest.mark.parametrize('backend', ['excel', 'journal'])
+def test_killed_flush_never_leaves_stock_half_written(tmp_path, backend):
+    # Long enough for the child to start and complete some flushes before each kill
+    rounds = list(run(str(tmp_path), rounds=3, parts=2000, backend=backend, wait=(3.0, 4.0)))
+    assert len(rounds) == 3
+
+    if backend == 'journal':
+        # One write per flush still keeps each change's reason and model
+        records = load_movements(open_storage(str(tmp_path / 'stock.xlsx'), backend))
+        kept = set(zip(records['reason'].astype(object), records['model'].fillna('')))
+        assert kept <= {(reason, model or '') for reason, model, _ in CHANGES}
+        assert len(kept) > 1
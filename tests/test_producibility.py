@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from producibility import (ProducibilityIndex, build_requirement_matrix, buildable_counts, calculate_buildable,
+                           calculate_producible)
+
+
+def test_negative_stock_builds_none_but_keeps_negative_producible():
+    df = pd.DataFrame({'Parts': ['Motor', 'Battery'], 'Stock': [-7, 10]})
+    parts_requirements = {'Round Model': {'Motor': 2, 'Battery': 1}, 'Loader': {'Battery': 5}}
+    assert calculate_buildable(df, parts_requirements) == {'Round Model': 0, 'Loader': 2}
+    # Per-part columns still show the shortfall
+    assert calculate_producible(df.copy(), parts_requirements)['Round Models that can be made'].tolist() == [-4, 10]
+
+
+def test_shortages_with_negative_stock_report_none_buildable():
+    parts = pd.Series(['Motor', 'Battery'])
+    stock = np.array([-7, 10], dtype=np.int32)
+    index = ProducibilityIndex(parts, stock, {'Round Model': {'Motor': 2, 'Battery': 1}})
+    assert index.buildable() == {'Round Model': 0}
+    report, buildable = index.shortages('Round Model', 3, parts, stock)
+    assert buildable == 0
+    assert report.loc[report['Parts'] == 'Motor', 'Shortfall'].item() == 13
+
+
+def test_random_updates_match_a_full_recalculation():
+    rng = np.random.default_rng(0)
+    parts = pd.Series([f"P{i}" for i in range(37)])
+    parts_requirements = {
+        model: {part: int(rng.integers(1, 6)) for part in parts if rng.random() < 0.4}
+        for model in ['Round Model', 'Loader', 'Cargo']
+    }
+    parts_requirements['Unused'] = {}
+    stock = rng.integers(-20, 200, len(parts)).astype(np.int32)
+    index = ProducibilityIndex(parts, stock, parts_requirements)
+    models, matrix = build_requirement_matrix(parts, parts_requirements)
+    for _ in range(200):
+        positions = rng.choice(len(parts), size=int(rng.integers(1, 6)))
+        stock[positions] += rng.integers(-50, 50, len(positions)).astype(np.int32)
+        index.update(positions, stock)
+
+        df = calculate_producible(pd.DataFrame({'Parts': parts, 'Stock': stock}), parts_requirements)
+        expected = np.column_stack([df[f"{model}s that can be made"] for model in models])
+        np.testing.assert_array_equal(index.producible, expected)
+        assert index.buildable() == dict(zip(models, buildable_counts(expected, matrix).tolist()))
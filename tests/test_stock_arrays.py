@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_arrays import StockTable
+
+
+def test_stock_outside_int32_is_refused_and_left_unchanged():
+    table = StockTable(pd.DataFrame({'Parts': ['Motor', 'Battery'], 'Stock': [2 ** 31 - 10, -5]}))
+    with pytest.raises(ValueError, match="int32"):
+        table.add_stock({'Battery': 1, 'Motor': 20})
+    with pytest.raises(ValueError, match="int32"):
+        table.set_stock({'Battery': -2 ** 31 - 1})
+    np.testing.assert_array_equal(table.stock, [2 ** 31 - 10, -5])
+    rows, new_stock = table.add_stock({'Motor': 9})
+    assert new_stock == {'Motor': 2 ** 31 - 1}
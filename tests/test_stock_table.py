@@ -0,0 +1,11 @@
+import numpy as np
+
+from stock_table import BAND_STYLES, DEFAULT_BAND_EDGES, assign_bands, band_labels, band_styles
+
+
+def test_default_bands_put_zero_stock_in_dark_red():
+    bands = assign_bands(np.array([-1, 0, 1, 100, 200, 201]), DEFAULT_BAND_EDGES)
+    assert bands.tolist() == [0, 0, 1, 1, 2, 3]
+    labels = band_labels(DEFAULT_BAND_EDGES)
+    assert [labels[band] for band in bands] == ['0 or less', '0 or less', '1-100', '1-100', '101-200', '200+']
+    assert band_styles(bands)[1] == BAND_STYLES[0]
@@ -0,0 +1,63 @@
+import pytest
+
+from write_behind import WriteBehindError, WriteBehindQueue
+
+
+# Storage whose writes fail until failing is cleared
+class FlakyStorage:
+    def __init__(self):
+        self.failing = True
+        self.written = {}
+
+    def version(self):
+        return len(self.written)
+
+    def apply_deltas(self, deltas, reason=None, model=None):
+        if self.failing:
+            raise OSError("disk full")
+        for part, delta in deltas.items():
+            self.written[part] = self.written.get(part, 0) + delta
+        return dict(self.written)
+
+
+def test_failing_writer_is_reported_and_retried():
+    storage = FlakyStorage()
+    # The worker waits retry_delay after a failure, well past the recovery below
+    queue = WriteBehindQueue(storage, max_delay=0, retry_delay=0.5)
+    queue.submit({'Motor': 2})
+    with pytest.raises(WriteBehindError, match="disk full"):
+        queue.flush(timeout=5)
+    assert isinstance(queue.last_error, OSError)
+    with pytest.raises(WriteBehindError):
+        queue.submit({'Motor': 1})
+
+    # Once storage recovers, the change that failed is written and new changes are accepted again
+    storage.failing = False
+    assert queue.flush(timeout=5)
+    assert queue.last_error is None
+    queue.submit({'Motor': 1})
+    assert queue.close(timeout=5)
+    assert storage.written == {'Motor': 3}
+
+
+# Storage that journals movements, counting its writes
+class JournalingStorage:
+    def __init__(self):
+        self.writes = []
+
+    def version(self):
+        return len(self.writes)
+
+    def record_movements(self, records):
+        self.writes.append(records)
+
+
+def test_mixed_changes_are_flushed_in_one_write():
+    storage = JournalingStorage()
+    queue = WriteBehindQueue(storage, max_delay=3600)
+    queue.submit({'Motor': 2}, 'received')
+    queue.submit({'Motor': -1, 'Battery': -1}, 'used', 'Round Model')
+    queue.submit({'Battery': 3}, 'received')
+    assert queue.close(timeout=5)
+    assert storage.writes == [[('Motor', 2, 'received', None), ('Battery', 3, 'received', None),
+                               ('Motor', -1, 'used', 'Round Model'), ('Battery', -1, 'used', 'Round Model')]]
@@ -0,0 +1,69 @@
+import os
+import threading
+
+import pandas as pd
+
+from excel_stream import read_table
+from instrumentation import span
+from sidecar import read_sidecar, write_sidecar
+
+# Parsed workbooks keyed on absolute path; each entry remembers the (mtime, size) it was parsed at
+_cache = {}
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'streamed': 0, 'sidecar': 0}
+
+# Workbooks larger than this are read in streamed batches with compact dtypes, keeping memory bounded
+stream_threshold_bytes = 20_000_000
+
+
+# Function to build the cache key for a file; raises FileNotFoundError like pd.read_excel would
+def _file_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Function to read an Excel file, parsing it only when it changed on disk and has no up-to-date columnar sidecar
+def read_workbook(path):
+    abs_path = os.path.abspath(path)
+    key = _file_key(abs_path)
+    with _lock:
+        entry = _cache.get(abs_path)
+        if entry is not None and entry[0] == key:
+            _stats['hits'] += 1
+            return entry[1].copy()
+    with span('load.sidecar') as timing:
+        df = read_sidecar(abs_path, key)
+        timing.rows = None if df is None else len(df)
+    from_sidecar = df is not None
+    streamed = not from_sidecar and key[1] > stream_threshold_bytes
+    if not from_sidecar:
+        with span('load.parse') as timing:
+            df = read_table(abs_path) if streamed else pd.read_excel(abs_path)
+            timing.rows = len(df)
+        write_sidecar(abs_path, df, key)
+    with _lock:
+        _stats['misses'] += 1
+        _stats['streamed'] += streamed
+        _stats['sidecar'] += from_sidecar
+        _cache[abs_path] = (key, df)
+    # Callers mutate the frame they get back, so never hand out the cached one
+    return df.copy()
+
+
+# Function to drop a cached workbook, e.g. right after we wrote it ourselves
+def invalidate(path):
+    with _lock:
+        _cache.pop(os.path.abspath(path), None)
+
+
+# Function to record a frame we just wrote to a workbook, so the next load reads the sidecar instead of the xlsx
+def saved(path, df):
+    abs_path = os.path.abspath(path)
+    invalidate(abs_path)
+    write_sidecar(abs_path, df, _file_key(abs_path))
+
+
+# Function to report cache hit/miss counters
+def cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_cache))
@@ -0,0 +1,153 @@
+import atexit
+import threading
+import time
+
+from part_index import add_stock, build_part_index
+from stock_service import apply_stock_groups
+
+
+# Raised by submit() and flush() while queued changes keep failing to reach storage; they stay queued and are retried
+class WriteBehindError(Exception):
+    pass
+
+
+# Stock changes applied in memory at once and written to storage by a background thread. Changes arriving
+# within max_delay of the first pending one are coalesced into a single storage write, which keeps each
+# change's reason and model where the backend journals them; pending changes are flushed on interpreter exit. Durability: a change is on disk at most max_delay (plus the time
+# of one write) after submit, or as soon as flush() returns. While the last write failed, last_error holds why
+# and submit() and flush() raise WriteBehindError, so callers learn their earlier changes are not saved yet.
+class WriteBehindQueue:
+    def __init__(self, storage, max_delay=1.0, retry_delay=1.0):
+        self.storage = storage
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.last_error = None
+        self.flushes = 0
+        self.failures = 0
+        # Callables run by the worker after each successful flush, with the storage version before and after it
+        self.flush_listeners = []
+        # (reason, model) -> {part: delta}, waiting to be written and being written
+        self._pending = {}
+        self._in_flight = {}
+        # Odd while a write is in progress; readers use it to tell whether storage already holds a change
+        self._generation = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread = None
+        self._condition = threading.Condition()
+        atexit.register(self.close)
+
+    # Function to raise the failure of the last write, if it failed; call with the condition held
+    def _raise_failure(self):
+        if self.last_error is not None:
+            raise WriteBehindError(f"Saving stock failed: {self.last_error}") from self.last_error
+
+    # Function to queue part -> delta changes; returns immediately, or raises if earlier changes are failing to save
+    def submit(self, deltas, reason=None, model=None):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            self._raise_failure()
+            group = self._pending.setdefault((reason, model), {})
+            for part, delta in deltas.items():
+                group[part] = group.get(part, 0) + int(delta)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stock-write-behind', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    # Function to total the changes not yet known to be on disk, per part; call with the condition held
+    def _unflushed(self):
+        totals = {}
+        for groups in (self._in_flight, self._pending):
+            for deltas in groups.values():
+                for part, delta in deltas.items():
+                    totals[part] = totals.get(part, 0) + delta
+        return {part: delta for part, delta in totals.items() if delta}
+
+    # Function to load stock from storage with the unflushed changes applied on top
+    def load(self):
+        while True:
+            with self._condition:
+                # A write in progress may or may not be visible yet; wait for it to finish
+                self._condition.wait_for(lambda: self._generation % 2 == 0)
+                generation = self._generation
+                unflushed = self._unflushed()
+            df = self.storage.load()
+            with self._condition:
+                if self._generation == generation:
+                    break
+        if unflushed:
+            add_stock(df, build_part_index(df), unflushed)
+        return df
+
+    def _run(self):
+        failed = False
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                # Once closed, a write that keeps failing is given up on; last_error says why
+                if not self._pending or (self._closed and failed):
+                    return
+                # Let more changes arrive so they share this write, unless someone is waiting on a flush
+                deadline = time.monotonic() + self.max_delay
+                self._condition.wait_for(lambda: self._flush_requested or self._closed,
+                                         timeout=max(deadline - time.monotonic(), 0))
+                self._in_flight, self._pending = self._pending, {}
+                self._generation += 1
+            error = None
+            try:
+                version_before = self.storage.version()
+                apply_stock_groups(self.storage, self._in_flight)
+                with self._condition:
+                    self._in_flight = {}
+                version_after = self.storage.version()
+            except Exception as write_error:
+                error = write_error
+            failed = error is not None
+            with self._condition:
+                self.last_error = error
+                # A write that failed goes back in front of newer changes
+                for key, deltas in self._pending.items():
+                    group = self._in_flight.setdefault(key, {})
+                    for part, delta in deltas.items():
+                        group[part] = group.get(part, 0) + delta
+                self._pending, self._in_flight = self._in_flight, {}
+                self._generation += 1
+                self.flushes += not failed
+                self.failures += failed
+                self._flush_requested = self._flush_requested and bool(self._pending)
+                self._condition.notify_all()
+            if failed:
+                time.sleep(self.retry_delay)
+            else:
+                for listener in list(self.flush_listeners):
+                    listener(version_before, version_after)
+
+    # Function to write everything queued so far and wait for it; returns False on timeout, raises
+    # WriteBehindError if the write fails
+    def flush(self, timeout=None):
+        with self._condition:
+            if not self._pending and not self._in_flight:
+                return True
+            failures = self.failures
+            self._flush_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: (not self._pending and not self._in_flight) or self.failures != failures,
+                                     timeout)
+            if self.failures != failures:
+                self._raise_failure()
+            return not self._pending and not self._in_flight
+
+    # Function to flush and stop the worker; called at interpreter exit
+    def close(self, timeout=None):
+        try:
+            flushed = self.flush(timeout)
+        except WriteBehindError:
+            flushed = False
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return flushed